@@ -2,12 +2,17 @@
 Database management endpoints
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, User, Database
-from app.core.security import get_current_active_user
+from app.core.security import get_current_active_user, get_owned_database, scope_databases
+from app.core.pagination import paginate
+from app.core.cache import cache_key, cache_get, cache_set, invalidate
+from app.core.etag import make_etag, etag_matches, not_modified
 from app.schemas.database import (
     DatabaseCreate, DatabaseUpdate, DatabaseResponse, DatabaseList
 )
@@ -19,13 +24,15 @@ router = APIRouter()
 @router.post("/", response_model=DatabaseResponse)
 async def create_database(
     database_data: DatabaseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new database"""
     # Check if database name already exists
-    existing_database = db.query(Database).filter(Database.name == database_data.name).first()
-    if existing_database:
+    name_taken = await db.scalar(
+        select(exists().where(Database.name == database_data.name))
+    )
+    if name_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Database name already exists"
@@ -34,60 +41,84 @@ async def create_database(
     # Create database using service
     database_service = DatabaseService(db)
     database = await database_service.create_database(database_data)
+    await invalidate("databases")
     
     return database
 
 
 @router.get("/", response_model=DatabaseList)
 async def get_databases(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    with_total: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get databases with pagination"""
-    query = db.query(Database)
+    """Get databases with keyset pagination"""
+    key = await cache_key("databases", current_user.id, current_user.is_admin, cursor, limit, with_total)
+    cached = await cache_get(key)
+    if cached is not None:
+        return JSONResponse(cached)
+    
+    # Project only the columns the list view needs
+    stmt = select(
+        Database.id, Database.name, Database.type,
+        Database.status, Database.created_at, Database.website_id
+    )
+    stmt = scope_databases(stmt, current_user)
     
-    # Filter by user if not admin
-    if not current_user.is_admin:
-        # Get user's websites and their databases
-        user_websites = db.query(Website).filter(Website.owner_id == current_user.id).all()
-        website_ids = [website.id for website in user_websites]
-        query = query.filter(Database.website_id.in_(website_ids))
+    # Counting is opt-in; admins get the planner estimate on PostgreSQL
+    count_stmt = None
+    if with_total:
+        count_stmt = scope_databases(select(func.count(Database.id)), current_user)
     
-    total = query.count()
-    databases = query.offset(skip).limit(limit).all()
+    databases, next_cursor, total = await paginate(
+        db, stmt, Database.id, cursor, limit, count_stmt, estimate=current_user.is_admin
+    )
     
-    return DatabaseList(
+    database_list = DatabaseList(
         databases=databases,
+        next_cursor=next_cursor,
+        has_next=next_cursor is not None,
         total=total,
-        page=skip // limit + 1,
         per_page=limit
     )
+    payload = database_list.model_dump(mode="json")
+    await cache_set(key, payload)
+    
+    # The rows were validated once, in bulk, when building the list model;
+    # returning a response directly skips FastAPI's second validation pass
+    return JSONResponse(payload)
+
+
+@router.get("/count")
+async def get_databases_count(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the total number of databases visible to the user"""
+    stmt = select(func.count(Database.id))
+    stmt = scope_databases(stmt, current_user)
+    
+    return {"total": await db.scalar(stmt)}
 
 
 @router.get("/{database_id}", response_model=DatabaseResponse)
 async def get_database(
     database_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific database"""
-    database = db.query(Database).filter(Database.id == database_id).first()
-    if not database:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Database not found"
-        )
+    database = await get_owned_database(db, database_id, current_user)
     
-    # Check permissions
-    if not current_user.is_admin:
-        website = db.query(Website).filter(Website.id == database.website_id).first()
-        if not website or website.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
+    # Databases have no updated_at, so key on the mutable response fields
+    etag = make_etag(database.id, database.username, database.status, database.website_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     
     return database
 
@@ -96,29 +127,16 @@ async def get_database(
 async def update_database(
     database_id: int,
     database_data: DatabaseUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a database"""
-    database = db.query(Database).filter(Database.id == database_id).first()
-    if not database:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Database not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin:
-        website = db.query(Website).filter(Website.id == database.website_id).first()
-        if not website or website.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
+    database = await get_owned_database(db, database_id, current_user)
     
     # Update database using service
     database_service = DatabaseService(db)
     updated_database = await database_service.update_database(database_id, database_data)
+    await invalidate("databases")
     
     return updated_database
 
@@ -126,29 +144,21 @@ async def update_database(
 @router.delete("/{database_id}")
 async def delete_database(
     database_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a database"""
-    database = db.query(Database).filter(Database.id == database_id).first()
-    if not database:
+    # Ownership is enforced by the DELETE statement itself
+    owner_id = None if current_user.is_admin else current_user.id
+    
+    # Delete database using service
+    database_service = DatabaseService(db)
+    if not await database_service.delete_database(database_id, owner_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Database not found"
         )
-    
-    # Check permissions
-    if not current_user.is_admin:
-        website = db.query(Website).filter(Website.id == database.website_id).first()
-        if not website or website.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
-    
-    # Delete database using service
-    database_service = DatabaseService(db)
-    await database_service.delete_database(database_id)
+    await invalidate("databases")
     
     return {"message": "Database deleted successfully"}
 
@@ -156,32 +166,14 @@ async def delete_database(
 @router.post("/{database_id}/backup")
 async def create_database_backup(
     database_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a backup of the database"""
-    database = db.query(Database).filter(Database.id == database_id).first()
-    if not database:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Database not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin:
-        website = db.query(Website).filter(Website.id == database.website_id).first()
-        if not website or website.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
+    database = await get_owned_database(db, database_id, current_user)
     
     # Create backup using service
     database_service = DatabaseService(db)
     backup = await database_service.create_backup(database_id)
     
     return {"message": "Database backup created successfully", "backup_id": backup.id}
-
-
-# Import at the end to avoid circular imports
-from app.core.database import Website 
\ No newline at end of file
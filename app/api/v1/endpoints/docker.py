@@ -3,45 +3,56 @@ Docker management endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, User
 from app.core.security import get_current_active_user
-from app.services.docker_service import DockerService
+from app.core.cache import cache_key, cache_get, cache_set, invalidate
+from app.services.docker_service import DockerService, get_docker_service
 
 router = APIRouter()
 
 
 @router.get("/containers")
 async def get_containers(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all Docker containers"""
-    docker_service = DockerService()
-    return await docker_service.get_containers()
+    key = await cache_key("docker", "containers")
+    cached = await cache_get(key)
+    if cached is not None:
+        return cached
+    
+    containers = await docker_service.get_containers()
+    if isinstance(containers, list):
+        await cache_set(key, containers)
+    
+    return containers
 
 
 @router.get("/containers/{container_id}")
 async def get_container(
     container_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific Docker container"""
-    docker_service = DockerService()
     return await docker_service.get_container(container_id)
 
 
 @router.post("/containers/{container_id}/start")
 async def start_container(
     container_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Start a Docker container"""
-    docker_service = DockerService()
     result = await docker_service.start_container(container_id)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": f"Container {container_id} started successfully"}
@@ -55,12 +66,13 @@ async def start_container(
 @router.post("/containers/{container_id}/stop")
 async def stop_container(
     container_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Stop a Docker container"""
-    docker_service = DockerService()
     result = await docker_service.stop_container(container_id)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": f"Container {container_id} stopped successfully"}
@@ -74,12 +86,13 @@ async def stop_container(
 @router.post("/containers/{container_id}/restart")
 async def restart_container(
     container_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Restart a Docker container"""
-    docker_service = DockerService()
     result = await docker_service.restart_container(container_id)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": f"Container {container_id} restarted successfully"}
@@ -93,12 +106,13 @@ async def restart_container(
 @router.delete("/containers/{container_id}")
 async def delete_container(
     container_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a Docker container"""
-    docker_service = DockerService()
     result = await docker_service.delete_container(container_id)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": f"Container {container_id} deleted successfully"}
@@ -111,23 +125,33 @@ async def delete_container(
 
 @router.get("/images")
 async def get_images(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all Docker images"""
-    docker_service = DockerService()
-    return await docker_service.get_images()
+    key = await cache_key("docker", "images")
+    cached = await cache_get(key)
+    if cached is not None:
+        return cached
+    
+    images = await docker_service.get_images()
+    if isinstance(images, list):
+        await cache_set(key, images)
+    
+    return images
 
 
 @router.post("/compose/up")
 async def docker_compose_up(
     compose_file: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Start Docker Compose services"""
-    docker_service = DockerService()
     result = await docker_service.compose_up(compose_file)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": "Docker Compose services started successfully"}
@@ -141,12 +165,13 @@ async def docker_compose_up(
 @router.post("/compose/down")
 async def docker_compose_down(
     compose_file: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    docker_service: DockerService = Depends(get_docker_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Stop Docker Compose services"""
-    docker_service = DockerService()
     result = await docker_service.compose_down(compose_file)
+    await invalidate("docker")
     
     if result["success"]:
         return {"message": "Docker Compose services stopped successfully"}
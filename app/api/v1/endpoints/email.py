@@ -2,65 +2,102 @@
 Email management endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, exists
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, User, EmailAccount
-from app.core.security import get_current_active_user
-from app.services.email_service import EmailService
+from app.core.security import get_current_active_user, scope_email_accounts
+from app.schemas.email import EMAIL_PATTERN, EmailAccountCreate, EmailAccountSummary
+from app.services.email_service import EmailService, get_email_service
 
 router = APIRouter()
 
 
-@router.get("/accounts")
+@router.get("/accounts", response_model=List[EmailAccountSummary])
 async def get_email_accounts(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get email accounts"""
-    query = db.query(EmailAccount)
+    stmt = select(
+        EmailAccount.id, EmailAccount.email, EmailAccount.domain, EmailAccount.quota,
+        EmailAccount.status, EmailAccount.created_at, EmailAccount.owner_id
+    )
+    stmt = scope_email_accounts(stmt, current_user)
     
-    # Filter by user if not admin
-    if not current_user.is_admin:
-        query = query.filter(EmailAccount.owner_id == current_user.id)
-    
-    accounts = query.all()
+    result = await db.execute(stmt.order_by(EmailAccount.id))
+    accounts = result.all()
     return accounts
 
 
-@router.post("/accounts")
+@router.post("/accounts", response_model=EmailAccountSummary)
 async def create_email_account(
-    email: str,
-    password: str,
-    domain: str,
+    email: str = Query(..., pattern=EMAIL_PATTERN),
+    password: str = Query(...),
+    domain: str = Query(...),
     quota: int = 1000,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new email account"""
     # Check if email already exists
-    existing_account = db.query(EmailAccount).filter(EmailAccount.email == email).first()
-    if existing_account:
+    email_taken = await db.scalar(
+        select(exists().where(EmailAccount.email == email))
+    )
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email account already exists"
         )
     
     # Create email account using service
-    email_service = EmailService(db)
-    account = await email_service.create_email_account(email, password, domain, quota, current_user.id)
+    account = await email_service.create_email_account(db, email, password, domain, quota, current_user.id)
     
     return account
 
 
+@router.post("/accounts/batch", response_model=List[EmailAccountSummary])
+async def create_email_accounts(
+    accounts: List[EmailAccountCreate],
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create several email accounts at once"""
+    emails = [account.email for account in accounts]
+    if len(set(emails)) != len(emails):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Duplicate email addresses in batch"
+        )
+    
+    # Check all addresses in one query
+    taken = (await db.scalars(
+        select(EmailAccount.email).where(EmailAccount.email.in_(emails))
+    )).all()
+    if taken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Email accounts already exist: {', '.join(taken)}"
+        )
+    
+    return await email_service.create_email_accounts(db, accounts, current_user.id)
+
+
 @router.delete("/accounts/{account_id}")
 async def delete_email_account(
     account_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete an email account"""
-    account = db.query(EmailAccount).filter(EmailAccount.id == account_id).first()
+    account = (await db.execute(
+        select(EmailAccount.owner_id).where(EmailAccount.id == account_id)
+    )).first()
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -75,15 +112,38 @@ async def delete_email_account(
         )
     
     # Delete email account using service
-    email_service = EmailService(db)
-    await email_service.delete_email_account(account_id)
+    await email_service.delete_email_account(db, account_id)
     
     return {"message": "Email account deleted successfully"}
 
 
+@router.delete("/accounts")
+async def delete_email_accounts(
+    ids: List[int] = Query(...),
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Delete several email accounts at once"""
+    stmt = scope_email_accounts(select(EmailAccount.id).where(EmailAccount.id.in_(ids)), current_user)
+    found = set((await db.scalars(stmt)).all())
+    
+    missing = set(ids) - found
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Email accounts not found: {', '.join(map(str, sorted(missing)))}"
+        )
+    
+    await email_service.delete_email_accounts(db, list(found))
+    
+    return {"message": f"{len(found)} email accounts deleted successfully"}
+
+
 @router.post("/setup")
 async def setup_email_server(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Setup email server (Postfix + Dovecot)"""
@@ -93,7 +153,6 @@ async def setup_email_server(
             detail="Admin privileges required"
         )
     
-    email_service = EmailService(db)
     result = await email_service.setup_email_server()
     
     if result["success"]:
@@ -107,9 +166,9 @@ async def setup_email_server(
 
 @router.get("/status")
 async def get_email_server_status(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get email server status"""
-    email_service = EmailService(db)
     return await email_service.get_server_status() 
\ No newline at end of file
@@ -2,44 +2,62 @@
 System monitoring and management endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, User
 from app.core.security import get_current_admin_user
-from app.services.system_monitor import SystemMonitor
+from app.core.etag import make_etag, etag_matches, not_modified
+from app.services.system_monitor import SystemMonitor, get_system_monitor
 
 router = APIRouter()
 
 
 @router.get("/status")
-async def get_system_status(current_user: User = Depends(get_current_admin_user)):
+async def get_system_status(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Get system status and health"""
-    monitor = SystemMonitor()
-    return await monitor.get_system_status()
+    system_status = await monitor.get_system_status()
+    
+    # The snapshot only changes when the monitor refreshes it
+    etag = make_etag(system_status["timestamp"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return system_status
 
 
 @router.get("/resources")
-async def get_system_resources(current_user: User = Depends(get_current_admin_user)):
+async def get_system_resources(
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Get system resource usage"""
-    monitor = SystemMonitor()
     return await monitor.get_resource_usage()
 
 
 @router.get("/services")
-async def get_services_status(current_user: User = Depends(get_current_admin_user)):
+async def get_services_status(
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Get status of system services"""
-    monitor = SystemMonitor()
     return await monitor.get_services_status()
 
 
 @router.post("/services/{service_name}/restart")
 async def restart_service(
     service_name: str,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
 ):
     """Restart a system service"""
-    monitor = SystemMonitor()
     result = await monitor.restart_service(service_name)
     
     if result["success"]:
@@ -55,17 +73,26 @@ async def restart_service(
 async def get_system_logs(
     service: str = None,
     lines: int = 100,
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
 ):
-    """Get system logs"""
-    monitor = SystemMonitor()
-    return await monitor.get_logs(service, lines)
+    """Stream the tail of a system or service log"""
+    log = monitor.open_log_file(service)
+    if log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Log file not found"
+        )
+    
+    return StreamingResponse(monitor.stream_logs(log, lines), media_type="text/plain")
 
 
 @router.post("/backup")
-async def create_system_backup(current_user: User = Depends(get_current_admin_user)):
+async def create_system_backup(
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Create a full system backup"""
-    monitor = SystemMonitor()
     result = await monitor.create_system_backup()
     
     if result["success"]:
@@ -78,16 +105,20 @@ async def create_system_backup(current_user: User = Depends(get_current_admin_us
 
 
 @router.get("/updates")
-async def check_updates(current_user: User = Depends(get_current_admin_user)):
+async def check_updates(
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Check for system updates"""
-    monitor = SystemMonitor()
     return await monitor.check_updates()
 
 
 @router.post("/updates")
-async def install_updates(current_user: User = Depends(get_current_admin_user)):
+async def install_updates(
+    current_user: User = Depends(get_current_admin_user),
+    monitor: SystemMonitor = Depends(get_system_monitor)
+):
     """Install system updates"""
-    monitor = SystemMonitor()
     result = await monitor.install_updates()
     
     if result["success"]:
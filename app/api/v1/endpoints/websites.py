@@ -3,11 +3,18 @@ Website management endpoints
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, User, Website
-from app.core.security import get_current_active_user, get_current_admin_user
+from app.core.security import (
+    get_current_active_user, get_current_admin_user, get_owned_website, scope_websites
+)
+from app.core.pagination import paginate
+from app.core.cache import cache_key, cache_get, cache_set, invalidate
+from app.core.etag import make_etag, etag_matches, not_modified
 from app.schemas.website import (
     WebsiteCreate, WebsiteUpdate, WebsiteResponse, WebsiteList, WebsiteStats
 )
@@ -20,13 +27,15 @@ router = APIRouter()
 @router.post("/", response_model=WebsiteResponse)
 async def create_website(
     website_data: WebsiteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new website"""
     # Check if domain already exists
-    existing_website = db.query(Website).filter(Website.domain == website_data.domain).first()
-    if existing_website:
+    domain_taken = await db.scalar(
+        select(exists().where(Website.domain == website_data.domain))
+    )
+    if domain_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Domain already exists"
@@ -35,84 +44,135 @@ async def create_website(
     # Create website using service
     website_service = WebsiteService(db)
     website = await website_service.create_website(website_data, current_user.id)
+    await invalidate("websites")
     
     return website
 
 
+@router.post("/batch", response_model=List[WebsiteResponse])
+async def create_websites(
+    websites_data: List[WebsiteCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create several websites at once"""
+    domains = [website_data.domain for website_data in websites_data]
+    if len(set(domains)) != len(domains):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Duplicate domains in batch"
+        )
+    
+    # Check all domains in one query
+    taken = (await db.scalars(
+        select(Website.domain).where(Website.domain.in_(domains))
+    )).all()
+    if taken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Domains already exist: {', '.join(taken)}"
+        )
+    
+    website_service = WebsiteService(db)
+    websites = await website_service.create_websites(websites_data, current_user.id)
+    await invalidate("websites")
+    
+    return websites
+
+
 @router.get("/", response_model=WebsiteList)
 async def get_websites(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    with_total: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get websites with pagination"""
-    query = db.query(Website)
+    """Get websites with keyset pagination"""
+    key = await cache_key("websites", current_user.id, current_user.is_admin, cursor, limit, with_total)
+    cached = await cache_get(key)
+    if cached is not None:
+        return JSONResponse(cached)
     
-    # Filter by user if not admin
-    if not current_user.is_admin:
-        query = query.filter(Website.owner_id == current_user.id)
+    # Project only the columns the list view needs
+    stmt = select(
+        Website.id, Website.domain, Website.name, Website.type,
+        Website.status, Website.ssl_enabled, Website.created_at, Website.owner_id
+    )
+    stmt = scope_websites(stmt, current_user)
     
-    total = query.count()
-    websites = query.offset(skip).limit(limit).all()
+    # Counting is opt-in; admins get the planner estimate on PostgreSQL
+    count_stmt = None
+    if with_total:
+        count_stmt = scope_websites(select(func.count(Website.id)), current_user)
     
-    return WebsiteList(
+    websites, next_cursor, total = await paginate(
+        db, stmt, Website.id, cursor, limit, count_stmt, estimate=current_user.is_admin
+    )
+    
+    website_list = WebsiteList(
         websites=websites,
+        next_cursor=next_cursor,
+        has_next=next_cursor is not None,
         total=total,
-        page=skip // limit + 1,
         per_page=limit
     )
+    payload = website_list.model_dump(mode="json")
+    await cache_set(key, payload)
+    
+    # The rows were validated once, in bulk, when building the list model;
+    # returning a response directly skips FastAPI's second validation pass
+    return JSONResponse(payload)
+
+
+@router.get("/count")
+async def get_websites_count(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the total number of websites visible to the user"""
+    stmt = select(func.count(Website.id))
+    stmt = scope_websites(stmt, current_user)
+    
+    return {"total": await db.scalar(stmt)}
 
 
 @router.get("/{website_id}", response_model=WebsiteResponse)
 async def get_website(
     website_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    # updated_at only has one-second resolution on SQLite, so two edits in
+    # the same second would share it; key on the whole representation instead
+    body = WebsiteResponse.model_validate(website)
+    etag = make_etag(body.model_dump_json())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     
-    return website
+    return body
 
 
 @router.put("/{website_id}", response_model=WebsiteResponse)
 async def update_website(
     website_id: int,
     website_data: WebsiteUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Update website using service
     website_service = WebsiteService(db)
     updated_website = await website_service.update_website(website_id, website_data)
+    await invalidate("websites")
     
     return updated_website
 
@@ -120,27 +180,16 @@ async def update_website(
 @router.delete("/{website_id}")
 async def delete_website(
     website_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Delete website using service
     website_service = WebsiteService(db)
     await website_service.delete_website(website_id)
+    await invalidate("websites", "databases")
     
     return {"message": "Website deleted successfully"}
 
@@ -148,23 +197,11 @@ async def delete_website(
 @router.post("/{website_id}/ssl")
 async def install_ssl(
     website_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Install SSL certificate for a website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Install SSL using service
     ssl_service = SSLService(db)
@@ -176,23 +213,11 @@ async def install_ssl(
 @router.get("/{website_id}/stats", response_model=WebsiteStats)
 async def get_website_stats(
     website_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get website statistics"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Get stats using service
     website_service = WebsiteService(db)
@@ -201,26 +226,30 @@ async def get_website_stats(
     return stats
 
 
+@router.post("/{website_id}/stats/refresh", response_model=WebsiteStats)
+async def refresh_website_stats(
+    website_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Re-measure website disk usage and return fresh statistics"""
+    website = await get_owned_website(db, website_id, current_user)
+    
+    website_service = WebsiteService(db)
+    await website_service.refresh_disk_usage(website_id)
+    stats = await website_service.get_website_stats(website_id)
+    
+    return stats
+
+
 @router.post("/{website_id}/backup")
 async def create_backup(
     website_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a backup of the website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Create backup using service
     website_service = WebsiteService(db)
@@ -232,23 +261,11 @@ async def create_backup(
 @router.post("/{website_id}/restart")
 async def restart_website(
     website_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Restart a website"""
-    website = db.query(Website).filter(Website.id == website_id).first()
-    if not website:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Website not found"
-        )
-    
-    # Check permissions
-    if not current_user.is_admin and website.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions"
-        )
+    website = await get_owned_website(db, website_id, current_user)
     
     # Restart website using service
     website_service = WebsiteService(db)
@@ -0,0 +1,97 @@
+"""
+Redis-backed result caching for read-heavy endpoints
+"""
+
+import json
+import time
+from typing import Any, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+CACHE_PREFIX = "hp"
+
+# Seconds to skip Redis after a connection failure
+RETRY_AFTER = 30
+
+_client = None
+_unavailable_until = 0.0
+
+
+def _get_client():
+    """Get the shared Redis client, or None while caching is unavailable"""
+    global _client
+
+    if not settings.CACHE_ENABLED or time.monotonic() < _unavailable_until:
+        return None
+
+    if _client is None:
+        _client = redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+    return _client
+
+
+def _mark_unavailable():
+    """Stop using Redis for a while after a failure"""
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + RETRY_AFTER
+
+
+async def cache_key(namespace: str, *parts) -> Optional[str]:
+    """Build a cache key bound to the current version of a namespace"""
+    client = _get_client()
+    if client is None:
+        return None
+
+    try:
+        version = await client.get(f"{CACHE_PREFIX}:{namespace}:version")
+    except (redis.RedisError, OSError):
+        _mark_unavailable()
+        return None
+
+    version = version.decode() if version else "0"
+    return ":".join([CACHE_PREFIX, namespace, version, *(str(part) for part in parts)])
+
+
+async def cache_get(key: Optional[str]) -> Optional[Any]:
+    """Get a cached value"""
+    client = _get_client()
+    if key is None or client is None:
+        return None
+
+    try:
+        value = await client.get(key)
+    except (redis.RedisError, OSError):
+        _mark_unavailable()
+        return None
+
+    return json.loads(value) if value is not None else None
+
+
+async def cache_set(key: Optional[str], value: Any):
+    """Store a JSON-serializable value for CACHE_TTL seconds"""
+    client = _get_client()
+    if key is None or client is None:
+        return
+
+    try:
+        await client.set(key, json.dumps(value), ex=settings.CACHE_TTL)
+    except (redis.RedisError, OSError):
+        _mark_unavailable()
+
+
+async def invalidate(*namespaces: str):
+    """Invalidate every cached entry of the given namespaces"""
+    client = _get_client()
+    if client is None:
+        return
+
+    try:
+        for namespace in namespaces:
+            await client.incr(f"{CACHE_PREFIX}:{namespace}:version")
+    except (redis.RedisError, OSError):
+        _mark_unavailable()
@@ -2,10 +2,11 @@
 Configuration settings for the Modern Hosting Panel
 """
 
+import json
 import os
-from typing import List, Optional
-from pydantic_settings import BaseSettings
-from pydantic import validator
+from typing import Annotated, List, Optional
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+from pydantic import field_validator, validator
 
 
 class Settings(BaseSettings):
@@ -25,14 +26,29 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./hosting_panel.db"
+    # Connections per worker = DB_POOL_SIZE + DB_MAX_OVERFLOW; keep the total
+    # across workers below the server's max_connections
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds
+    # Recycle connections before the server's idle timeout (MySQL wait_timeout
+    # defaults to 8h); pre-ping costs a round trip per checkout, so it is only
+    # worth enabling when the network between app and database is unreliable
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = False
+    # Compiled SQL statements cached per engine
+    DB_QUERY_CACHE_SIZE: int = 1200
+    
+    # MySQL/MariaDB server hosting site databases
+    MYSQL_HOST: str = "localhost"
+    MYSQL_PORT: int = 3306
+    MYSQL_ADMIN_USER: str = "root"
+    MYSQL_ADMIN_PASSWORD: str = "root_password"
+    MYSQL_POOL_MIN_SIZE: int = 2
+    MYSQL_POOL_MAX_SIZE: int = 10
     
     # CORS
-    ALLOWED_HOSTS: List[str] = ["*"]
-    
-    @validator("ALLOWED_HOSTS", pre=True)
-    def parse_allowed_hosts(cls, v):
-        # Simple parsing - always return ["*"] for simplicity
-        return ["*"]
+    ALLOWED_HOSTS: Annotated[List[str], NoDecode] = ["*"]
     
     # File paths
     BASE_DIR: str = "/var/www"
@@ -43,17 +59,27 @@ class Settings(BaseSettings):
     
     # Web server settings
     WEB_SERVER: str = "nginx"  # nginx or apache
-    PHP_VERSIONS: List[str] = ["7.4", "8.0", "8.1", "8.2"]
+    PHP_VERSIONS: Annotated[List[str], NoDecode] = ["7.4", "8.0", "8.1", "8.2"]
     DEFAULT_PHP_VERSION: str = "8.1"
     
-    @validator("PHP_VERSIONS", pre=True)
-    def parse_php_versions(cls, v):
-        # Simple parsing - always return default PHP versions
-        return ["7.4", "8.0", "8.1", "8.2"]
+    @field_validator("ALLOWED_HOSTS", "PHP_VERSIONS", mode="before")
+    @classmethod
+    def parse_list(cls, v):
+        # Accept a JSON list ('["a","b"]') or a comma-separated string (a,b)
+        if isinstance(v, str):
+            v = v.strip()
+            if v.startswith("["):
+                return json.loads(v)
+            return [item.strip() for item in v.split(",") if item.strip()]
+        return v
     
     # SSL settings
     CERTBOT_EMAIL: Optional[str] = None
     SSL_PROVIDER: str = "letsencrypt"  # letsencrypt or custom
+    # In-process ACME client; certbot is only used when the acme package is missing
+    ACME_DIRECTORY_URL: str = "https://acme-v02.api.letsencrypt.org/directory"
+    ACME_ACCOUNT_KEY_PATH: str = "/etc/hosting-panel/acme/account.pem"
+    ACME_CERT_DIR: str = "/etc/hosting-panel/ssl"
     
     # Email settings
     EMAIL_ENABLED: bool = False
@@ -74,6 +100,7 @@ class Settings(BaseSettings):
     BACKUP_ENABLED: bool = True
     BACKUP_RETENTION_DAYS: int = 30
     BACKUP_PATH: str = "/var/backups/hosting-panel"
+    BACKUP_TIMEOUT: int = 3600  # seconds
     
     # Monitoring
     MONITORING_ENABLED: bool = True
@@ -86,6 +113,8 @@ class Settings(BaseSettings):
     
     # Redis (for caching and background tasks)
     REDIS_URL: str = "redis://localhost:6379"
+    CACHE_ENABLED: bool = True
+    CACHE_TTL: int = 30  # seconds
     
     @validator("SECRET_KEY")
     def validate_secret_key(cls, v):
@@ -99,9 +128,7 @@ class Settings(BaseSettings):
             print("⚠️  Warning: Using default admin password. Change this in production!")
         return v
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 
 # Create settings instance
@@ -2,23 +2,54 @@
 Database configuration and models for the Modern Hosting Panel
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, ForeignKey, Index, JSON
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
+import asyncio
 import os
 
 from app.core.config import settings
 
+# Async drivers for the plain URL schemes used in configuration
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+    "mysql://": "mysql+aiomysql://",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a plain database URL onto its async driver"""
+    for scheme, async_scheme in ASYNC_DRIVERS.items():
+        if url.startswith(scheme):
+            return async_scheme + url[len(scheme):]
+    return url
+
+
+# Engine options; the pool is only sized for server databases, SQLite keeps its default
+engine_options = {"query_cache_size": settings.DB_QUERY_CACHE_SIZE}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    engine_options.update(
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = create_async_engine(get_async_database_url(settings.DATABASE_URL), **engine_options)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
@@ -37,8 +68,8 @@ class User(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
-    # Relationships
-    websites = relationship("Website", back_populates="owner")
+    # Relationships (never lazy-loaded; use selectinload/joinedload explicitly)
+    websites = relationship("Website", back_populates="owner", lazy="raise_on_sql")
 
 
 class Website(Base):
@@ -55,15 +86,26 @@ class Website(Base):
     ssl_enabled = Column(Boolean, default=False)
     ssl_cert_path = Column(String, nullable=True)
     ssl_key_path = Column(String, nullable=True)
+    # Bytes under document_root as last measured; stats reads re-measure
+    # when the tree has changed and store the new figure
+    disk_usage = Column(BigInteger, default=0)
+    disk_usage_dirty = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"))
     
-    # Relationships
-    owner = relationship("User", back_populates="websites")
-    databases = relationship("Database", back_populates="website")
+    # Relationships (never lazy-loaded; use selectinload/joinedload explicitly)
+    owner = relationship("User", back_populates="websites", lazy="raise_on_sql")
+    databases = relationship(
+        "Database", back_populates="website", lazy="raise_on_sql", passive_deletes=True
+    )
+    
+    # Keyset pagination index for owner-scoped listings
+    __table_args__ = (
+        Index("ix_websites_owner_id_id", "owner_id", "id"),
+    )
 
 
 class Database(Base):
@@ -79,10 +121,15 @@ class Database(Base):
     created_at = Column(DateTime, default=func.now())
     
     # Foreign keys
-    website_id = Column(Integer, ForeignKey("websites.id"))
+    website_id = Column(Integer, ForeignKey("websites.id", ondelete="CASCADE"))
+    
+    # Relationships (never lazy-loaded; use selectinload/joinedload explicitly)
+    website = relationship("Website", back_populates="databases", lazy="raise_on_sql")
     
-    # Relationships
-    website = relationship("Website", back_populates="databases")
+    # Keyset pagination index for website-scoped listings
+    __table_args__ = (
+        Index("ix_databases_website_id_id", "website_id", "id"),
+    )
 
 
 class EmailAccount(Base):
@@ -99,6 +146,11 @@ class EmailAccount(Base):
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"))
+    
+    # Ordered owner-scoped listings
+    __table_args__ = (
+        Index("ix_email_accounts_owner_id_id", "owner_id", "id"),
+    )
 
 
 class SystemLog(Base):
@@ -123,6 +175,15 @@ class Backup(Base):
     size = Column(Integer)  # bytes
     status = Column(String, default="completed")  # completed, failed, in_progress
     created_at = Column(DateTime, default=func.now())
+    
+    # Foreign keys; backups outlive the website they were taken of
+    website_id = Column(Integer, ForeignKey("websites.id", ondelete="SET NULL"))
+    
+    # Latest-backup lookups by type, and per website
+    __table_args__ = (
+        Index("ix_backups_type_name", "type", "name"),
+        Index("ix_backups_website_id_created_at", "website_id", created_at.desc()),
+    )
 
 
 class DockerContainer(Base):
@@ -133,30 +194,29 @@ class DockerContainer(Base):
     name = Column(String, unique=True, index=True)
     image = Column(String)
     status = Column(String, default="stopped")  # running, stopped, paused
-    ports = Column(Text)  # JSON string of port mappings
-    volumes = Column(Text)  # JSON string of volume mappings
-    environment = Column(Text)  # JSON string of environment variables
+    ports = Column(JSON)  # port mappings
+    volumes = Column(JSON)  # volume mappings
+    environment = Column(JSON)  # environment variables
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
 # Database dependency
-def get_db():
+async def get_db():
     """Get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 async def init_db():
     """Initialize database"""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    
-    # Create backup directory if it doesn't exist
-    os.makedirs(settings.BACKUP_PATH, exist_ok=True)
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
     
-    # Create base directory if it doesn't exist
-    os.makedirs(settings.BASE_DIR, exist_ok=True) 
\ No newline at end of file
+    # Create tables while the backup and base directories are created
+    await asyncio.gather(
+        create_tables(),
+        asyncio.to_thread(os.makedirs, settings.BACKUP_PATH, exist_ok=True),
+        asyncio.to_thread(os.makedirs, settings.BASE_DIR, exist_ok=True)
+    ) 
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Pooled administrative connection to the MySQL/MariaDB server hosting site databases
+"""
+
+import asyncio
+from typing import Any, List, Optional, Sequence, Tuple
+
+import aiomysql
+
+from app.core.config import settings
+
+_pool: Optional[aiomysql.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool() -> aiomysql.Pool:
+    """Get the shared admin connection pool, creating it on first use"""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=settings.MYSQL_HOST,
+                port=settings.MYSQL_PORT,
+                user=settings.MYSQL_ADMIN_USER,
+                password=settings.MYSQL_ADMIN_PASSWORD,
+                minsize=settings.MYSQL_POOL_MIN_SIZE,
+                maxsize=settings.MYSQL_POOL_MAX_SIZE,
+                autocommit=True
+            )
+    return _pool
+
+
+async def close_pool():
+    """Close the admin connection pool"""
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a MySQL identifier such as a database or table name"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+async def execute(*statements: Tuple[str, Optional[Sequence[Any]]]) -> List[tuple]:
+    """Run (sql, args) statements on one pooled connection, returning the last result set"""
+    pool = await get_pool()
+    rows: List[tuple] = []
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for sql, args in statements:
+                await cur.execute(sql, args)
+                rows = list(await cur.fetchall())
+
+    return rows
+
+
+async def fetch_one(sql: str, args: Optional[Sequence[Any]] = None) -> Optional[tuple]:
+    """Run a single query on a pooled connection and return its first row"""
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, args)
+            return await cur.fetchone()
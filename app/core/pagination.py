@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+
+import base64
+import binascii
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen row id into an opaque cursor"""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode an opaque cursor back into the last seen row id"""
+    if cursor is None:
+        return None
+
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def estimate_rows(db, table_name: str) -> Optional[int]:
+    """Get the planner's row estimate for a table, or None if unavailable"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+
+    # reltuples is O(1) but only refreshed by VACUUM/ANALYZE
+    value = await db.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+        {"name": table_name}
+    )
+    return value if value is not None and value >= 0 else None
+
+
+async def paginate(db, stmt, id_column, cursor: Optional[str], limit: int,
+                   count_stmt=None, estimate: bool = False):
+    """Fetch one keyset page ordered by id, returning (rows, next_cursor, total)
+
+    When count_stmt is given the total rides along with the page as a scalar
+    subquery, so rows and count come back in a single round trip.
+    """
+    total = None
+    if count_stmt is not None and estimate:
+        total = await estimate_rows(db, id_column.table.name)
+        if total is not None:
+            count_stmt = None
+
+    if count_stmt is not None:
+        stmt = stmt.add_columns(
+            count_stmt.scalar_subquery().correlate(None).label("total")
+        )
+
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        stmt = stmt.where(id_column > last_id)
+
+    # Fetch one extra row to detect whether another page exists
+    result = await db.execute(stmt.order_by(id_column).limit(limit + 1))
+    items = result.all()
+
+    if count_stmt is not None:
+        # A page past the end carries no row to read the total from
+        total = items[0].total if items else await db.scalar(count_stmt)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].id)
+
+    return items, next_cursor, total
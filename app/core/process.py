@@ -0,0 +1,97 @@
+"""
+Non-blocking helpers for running system commands
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+from typing import Optional
+
+# Seconds an apt package index refresh stays fresh
+APT_UPDATE_MAX_AGE = 3600
+
+_apt_updated_at: Optional[float] = None
+# Serializes every apt/dpkg invocation in the process
+_apt_lock = asyncio.Lock()
+
+
+async def run_command(
+    *argv: str,
+    check: bool = False,
+    capture: bool = False,
+    input: Optional[str] = None,
+    timeout: Optional[float] = None,
+    new_session: bool = False
+) -> subprocess.CompletedProcess:
+    """Run a command without blocking the event loop
+
+    Mirrors subprocess.run: returns a CompletedProcess with text stdout/stderr
+    when capture is set, and raises CalledProcessError when check is set.
+    With new_session the command leads its own process group, and a timeout
+    kills the whole group, including any children it spawned.
+    """
+    pipe = asyncio.subprocess.PIPE if capture else None
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=pipe,
+        stderr=pipe,
+        start_new_session=new_session
+    )
+
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate(input.encode() if input is not None else None),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        if new_session:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(list(argv), timeout)
+
+    result = subprocess.CompletedProcess(
+        list(argv),
+        proc.returncode,
+        stdout.decode() if stdout is not None else None,
+        stderr.decode() if stderr is not None else None
+    )
+    if check:
+        result.check_returncode()
+    return result
+
+
+async def _refresh_apt_index(max_age: float):
+    """Run apt-get update unless the index is younger than max_age; caller holds _apt_lock"""
+    global _apt_updated_at
+
+    if _apt_updated_at is not None and time.monotonic() - _apt_updated_at < max_age:
+        return
+
+    await run_command("apt-get", "update", check=True)
+    _apt_updated_at = time.monotonic()
+
+
+async def apt_update(max_age: float = APT_UPDATE_MAX_AGE):
+    """Refresh the apt package index unless it was refreshed recently"""
+    async with _apt_lock:
+        await _refresh_apt_index(max_age)
+
+
+async def apt_install(*packages: str):
+    """Install packages, refreshing a stale package index first"""
+    # apt and dpkg hold exclusive locks, so a concurrent run would fail on
+    # /var/lib/dpkg/lock; queue behind the lock instead
+    async with _apt_lock:
+        await _refresh_apt_index(APT_UPDATE_MAX_AGE)
+        await run_command("apt-get", "install", "-y", *packages, check=True)
+
+
+async def run_apt(*argv: str, **kwargs) -> subprocess.CompletedProcess:
+    """Run an apt-get command serialized with every other apt run"""
+    async with _apt_lock:
+        return await run_command("apt-get", *argv, **kwargs)
@@ -8,10 +8,12 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.core.config import settings
-from app.core.database import get_db, User
+from app.core.database import get_db, SessionLocal, User, Website, Database, EmailAccount
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -57,7 +59,7 @@ def verify_token(token: str) -> Optional[dict]:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user"""
     credentials_exception = HTTPException(
@@ -75,7 +77,7 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
     
@@ -101,36 +103,98 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
 
 async def create_admin_user():
     """Create default admin user if it doesn't exist"""
-    db = next(get_db())
-    try:
-        # Check if admin user exists
-        admin_user = db.query(User).filter(User.username == settings.ADMIN_USERNAME).first()
-        
-        if not admin_user:
-            # Create admin user
-            admin_user = User(
-                username=settings.ADMIN_USERNAME,
-                email=settings.ADMIN_EMAIL,
-                hashed_password=get_password_hash(settings.ADMIN_PASSWORD),
-                is_admin=True,
-                is_active=True
+    async with SessionLocal() as db:
+        try:
+            # Check if admin user exists
+            admin_user = await db.scalar(
+                select(User).where(User.username == settings.ADMIN_USERNAME)
             )
-            db.add(admin_user)
-            db.commit()
-            print(f"✅ Admin user '{settings.ADMIN_USERNAME}' created successfully")
-        else:
-            print(f"ℹ️  Admin user '{settings.ADMIN_USERNAME}' already exists")
-    except Exception as e:
-        print(f"❌ Error creating admin user: {e}")
-    finally:
-        db.close()
-
-
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+            
+            if not admin_user:
+                # Create admin user
+                admin_user = User(
+                    username=settings.ADMIN_USERNAME,
+                    email=settings.ADMIN_EMAIL,
+                    hashed_password=get_password_hash(settings.ADMIN_PASSWORD),
+                    is_admin=True,
+                    is_active=True
+                )
+                db.add(admin_user)
+                await db.commit()
+                print(f"✅ Admin user '{settings.ADMIN_USERNAME}' created successfully")
+            else:
+                print(f"ℹ️  Admin user '{settings.ADMIN_USERNAME}' already exists")
+        except Exception as e:
+            print(f"❌ Error creating admin user: {e}")
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user"""
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         return None
     if not verify_password(password, user.hashed_password):
         return None
-    return user 
\ No newline at end of file
+    return user
+
+
+async def get_owned_website(db: AsyncSession, website_id: int, user: User) -> Website:
+    """Load a website and ensure the user may access it"""
+    website = await db.scalar(select(Website).where(Website.id == website_id))
+    if not website:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Website not found"
+        )
+    
+    if not user.is_admin and website.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    return website
+
+
+async def get_owned_database(db: AsyncSession, database_id: int, user: User) -> Database:
+    """Load a database together with its website and ensure the user may access it"""
+    database = await db.scalar(
+        select(Database).options(joinedload(Database.website)).where(Database.id == database_id)
+    )
+    if not database:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Database not found"
+        )
+    
+    if not user.is_admin:
+        if not database.website or database.website.owner_id != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+    
+    return database
+
+
+def scope_websites(stmt, user: User):
+    """Restrict a statement over websites to those the user may see"""
+    if user.is_admin:
+        return stmt
+    return stmt.where(Website.owner_id == user.id)
+
+
+def scope_databases(stmt, user: User):
+    """Restrict a statement over databases to those of the user's websites"""
+    if user.is_admin:
+        return stmt
+    return stmt.join(Website, Database.website_id == Website.id).where(
+        Website.owner_id == user.id
+    )
+
+
+def scope_email_accounts(stmt, user: User):
+    """Restrict a statement over email accounts to those the user may see"""
+    if user.is_admin:
+        return stmt
+    return stmt.where(EmailAccount.owner_id == user.id)
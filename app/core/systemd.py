@@ -0,0 +1,81 @@
+"""
+Query systemd unit state over the D-Bus system bus
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+from dbus_next import BusType, Message, MessageType
+from dbus_next.aio import MessageBus
+
+from app.core.process import run_command
+
+SYSTEMD_SERVICE = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+
+_bus: Optional[MessageBus] = None
+_bus_lock = asyncio.Lock()
+
+# Unit object paths are stable for the lifetime of systemd
+_unit_paths: Dict[str, str] = {}
+
+
+async def get_bus() -> MessageBus:
+    """Get the shared system bus connection, connecting on first use"""
+    global _bus
+
+    async with _bus_lock:
+        if _bus is None or not _bus.connected:
+            _bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+            _unit_paths.clear()
+    return _bus
+
+
+def close_bus():
+    """Disconnect from the system bus"""
+    global _bus
+
+    if _bus is not None:
+        _bus.disconnect()
+        _bus = None
+
+
+async def _call(bus: MessageBus, **kwargs) -> Message:
+    """Call a systemd method, raising on an error reply"""
+    reply = await bus.call(Message(destination=SYSTEMD_SERVICE, **kwargs))
+    if reply.message_type == MessageType.ERROR:
+        raise RuntimeError(f"{reply.error_name}: {reply.body}")
+    return reply
+
+
+async def _unit_active_dbus(name: str) -> bool:
+    """Read a unit's ActiveState property over D-Bus"""
+    bus = await get_bus()
+
+    path = _unit_paths.get(name)
+    if path is None:
+        # LoadUnit, unlike GetUnit, also resolves units that aren't loaded
+        reply = await _call(
+            bus, path=SYSTEMD_PATH, interface="org.freedesktop.systemd1.Manager",
+            member="LoadUnit", signature="s", body=[name]
+        )
+        path = _unit_paths[name] = reply.body[0]
+
+    reply = await _call(
+        bus, path=path, interface="org.freedesktop.DBus.Properties",
+        member="Get", signature="ss", body=["org.freedesktop.systemd1.Unit", "ActiveState"]
+    )
+    return reply.body[0].value == "active"
+
+
+async def unit_active(name: str) -> bool:
+    """Check whether a systemd unit is active
+
+    Falls back to forking systemctl where no system bus is reachable, e.g.
+    inside a container.
+    """
+    try:
+        return await _unit_active_dbus(name)
+    except (OSError, RuntimeError, ValueError):
+        result = await run_command("systemctl", "is-active", name, capture=True)
+        return result.returncode == 0
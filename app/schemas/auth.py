@@ -2,7 +2,7 @@
 Authentication schemas
 """
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
 
 
@@ -36,8 +36,7 @@ class UserResponse(BaseModel):
     is_active: bool
     is_admin: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -2,7 +2,7 @@
 Database schemas
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -13,9 +13,15 @@ class DatabaseBase(BaseModel):
     type: str = "mysql"  # mysql, postgresql
 
 
+# MySQL can't bind identifiers as parameters, so names are restricted to a
+# safe charset before they are quoted into DDL
+MYSQL_NAME_PATTERN = r"^[A-Za-z0-9_]+$"
+
+
 class DatabaseCreate(DatabaseBase):
     """Database creation schema"""
-    username: str
+    name: str = Field(max_length=64, pattern=MYSQL_NAME_PATTERN)
+    username: str = Field(max_length=32, pattern=MYSQL_NAME_PATTERN)
     password: str
 
 
@@ -33,8 +39,19 @@ class DatabaseResponse(DatabaseBase):
     created_at: datetime
     website_id: int
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DatabaseSummary(BaseModel):
+    """Database list item schema"""
+    id: int
+    name: str
+    type: str
+    status: str
+    created_at: datetime
+    website_id: Optional[int] = None
+    
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DatabaseStats(BaseModel):
@@ -48,7 +65,8 @@ class DatabaseStats(BaseModel):
 
 class DatabaseList(BaseModel):
     """Database list response schema"""
-    databases: List[DatabaseResponse]
-    total: int
-    page: int
+    databases: List[DatabaseSummary]
+    next_cursor: Optional[str] = None
+    has_next: bool = False
+    total: Optional[int] = None
     per_page: int 
\ No newline at end of file
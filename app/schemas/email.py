@@ -0,0 +1,32 @@
+"""
+Email schemas
+"""
+
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+
+
+# Addresses become keys in Dovecot's colon-separated passwd-file and paths
+# under the mail spool, so only plain dot-separated atoms are allowed
+EMAIL_PATTERN = r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*@[A-Za-z0-9-]+(\.[A-Za-z0-9-]+)+$"
+
+
+class EmailAccountCreate(BaseModel):
+    """Email account creation schema"""
+    email: str = Field(pattern=EMAIL_PATTERN)
+    password: str
+    domain: str
+    quota: int = 1000
+
+
+class EmailAccountSummary(BaseModel):
+    """Email account list item schema"""
+    id: int
+    email: str
+    domain: str
+    quota: int
+    status: str
+    created_at: datetime
+    owner_id: int
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -2,7 +2,7 @@
 Website schemas
 """
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, ConfigDict, HttpUrl
 from typing import Optional, List
 from datetime import datetime
 
@@ -41,8 +41,21 @@ class WebsiteResponse(WebsiteBase):
     updated_at: datetime
     owner_id: int
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class WebsiteSummary(BaseModel):
+    """Website list item schema"""
+    id: int
+    domain: str
+    name: str
+    type: str
+    status: str
+    ssl_enabled: bool
+    created_at: datetime
+    owner_id: int
+    
+    model_config = ConfigDict(from_attributes=True)
 
 
 class WebsiteStats(BaseModel):
@@ -56,7 +69,8 @@ class WebsiteStats(BaseModel):
 
 class WebsiteList(BaseModel):
     """Website list response schema"""
-    websites: List[WebsiteResponse]
-    total: int
-    page: int
+    websites: List[WebsiteSummary]
+    next_cursor: Optional[str] = None
+    has_next: bool = False
+    total: Optional[int] = None
     per_page: int 
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+In-process ACME client for issuing Let's Encrypt certificates
+"""
+
+import datetime
+import os
+import threading
+from typing import Dict, List
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.core.config import settings
+
+try:
+    import josepy as jose
+    from acme import challenges, client, crypto_util, errors, messages
+except ImportError:
+    # SSLService falls back to the certbot command line
+    client = None
+
+ACME_AVAILABLE = client is not None
+
+# Certificates this close to expiry are renewed
+RENEW_BEFORE = datetime.timedelta(days=30)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _generate_key() -> rsa.RSAPrivateKey:
+    """Generate an RSA key for an account or certificate"""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _key_pem(key: rsa.RSAPrivateKey) -> bytes:
+    """Serialize a private key as unencrypted PKCS#8 PEM"""
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+
+def _write_private(path: str, data: bytes):
+    """Write a file readable only by its owner"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+def _load_account_key() -> rsa.RSAPrivateKey:
+    """Load the ACME account key, generating it on first use"""
+    path = settings.ACME_ACCOUNT_KEY_PATH
+    try:
+        with open(path, "rb") as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+    except FileNotFoundError:
+        key = _generate_key()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_private(path, _key_pem(key))
+        return key
+
+
+def _get_client():
+    """Get the shared ACME client, registering the account on first use"""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                net = client.ClientNetwork(
+                    jose.JWKRSA(key=_load_account_key()),
+                    user_agent=f"{settings.APP_NAME}/{settings.VERSION}"
+                )
+                directory = client.ClientV2.get_directory(settings.ACME_DIRECTORY_URL, net)
+                acme = client.ClientV2(directory, net)
+
+                registration = messages.NewRegistration.from_data(
+                    email=settings.CERTBOT_EMAIL, terms_of_service_agreed=True
+                )
+                try:
+                    acme.new_account(registration)
+                except errors.ConflictError as e:
+                    # The key is already registered; look the account up
+                    acme.query_registration(
+                        messages.RegistrationResource(uri=e.location, body=registration)
+                    )
+                _client = acme
+    return _client
+
+
+def issue_certificate(domains: List[str], webroot: str, live_dir: str) -> Dict[str, str]:
+    """Obtain a certificate over HTTP-01 and store it in certbot's live layout
+
+    Blocking; run it in a worker thread.
+    """
+    acme = _get_client()
+
+    key_pem = _key_pem(_generate_key())
+    order = acme.new_order(crypto_util.make_csr(key_pem, domains))
+
+    # Answer every pending HTTP-01 challenge from the site's webroot
+    challenge_files = []
+    try:
+        for authz in order.authorizations:
+            if authz.body.status == messages.STATUS_VALID:
+                continue
+
+            challb = next(
+                challb for challb in authz.body.challenges
+                if isinstance(challb.chall, challenges.HTTP01)
+            )
+            response, validation = challb.response_and_validation(acme.net.key)
+
+            path = os.path.join(webroot, challb.chall.path.lstrip("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(validation)
+            challenge_files.append(path)
+
+            acme.answer_challenge(challb, response)
+
+        order = acme.poll_and_finalize(order)
+    finally:
+        for path in challenge_files:
+            os.remove(path)
+
+    fullchain = order.fullchain_pem.encode()
+    certs = x509.load_pem_x509_certificates(fullchain)
+
+    os.makedirs(live_dir, exist_ok=True)
+    paths = {
+        name: os.path.join(live_dir, f"{name}.pem")
+        for name in ("cert", "chain", "fullchain", "privkey")
+    }
+    contents = {
+        "cert": certs[0].public_bytes(serialization.Encoding.PEM),
+        "chain": b"".join(cert.public_bytes(serialization.Encoding.PEM) for cert in certs[1:]),
+        "fullchain": fullchain
+    }
+
+    # Stage all four files, then swap them in with the key last, so a web
+    # server reload in between never loads a key without its certificate
+    for name, data in contents.items():
+        with open(paths[name] + ".tmp", "wb") as f:
+            f.write(data)
+    _write_private(paths["privkey"] + ".tmp", key_pem)
+    for name in ("cert", "chain", "fullchain", "privkey"):
+        os.replace(paths[name] + ".tmp", paths[name])
+
+    return paths
+
+
+def revoke_certificate(cert_path: str):
+    """Revoke a certificate issued to the panel's ACME account
+
+    Blocking; run it in a worker thread.
+    """
+    with open(cert_path, "rb") as f:
+        cert = x509.load_pem_x509_certificate(f.read())
+
+    _get_client().revoke(cert, 0)
+
+
+def needs_renewal(cert_path: str) -> bool:
+    """Check whether a certificate is missing or close to expiry"""
+    try:
+        with open(cert_path, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+    except FileNotFoundError:
+        return True
+
+    expires_in = cert.not_valid_after_utc - datetime.datetime.now(datetime.timezone.utc)
+    return expires_in < RENEW_BEFORE
@@ -2,45 +2,68 @@
 Database service for managing MySQL/MariaDB databases
 """
 
+import asyncio
+import gzip
+import shutil
 import subprocess
 import os
-from typing import Optional
-from sqlalchemy.orm import Session
-from datetime import datetime
+import time
+from typing import List, Optional
+from sqlalchemy import Row, bindparam, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import Database, Backup
+from app.core import mysql
+from app.core.database import Database, Backup, Website
 from app.schemas.database import DatabaseCreate, DatabaseUpdate
 
 
+# Built once; SQLAlchemy's compiled cache then serves every lookup
+DATABASE_BY_ID = select(Database).where(Database.id == bindparam("database_id"))
+
+
+async def delete_returning(db: AsyncSession, stmt, *columns) -> List[Row]:
+    """Run a DELETE and return columns of the rows it removed
+
+    MySQL has no DELETE ... RETURNING, so there the rows are read and
+    locked with SELECT ... FOR UPDATE first, in the same transaction.
+    """
+    if db.get_bind().dialect.delete_returning:
+        result = await db.execute(stmt.returning(*columns))
+        return result.all()
+    
+    result = await db.execute(
+        select(*columns).where(stmt.whereclause).with_for_update()
+    )
+    rows = result.all()
+    if rows:
+        await db.execute(stmt)
+    return rows
+
+
 class DatabaseService:
     """Service for managing databases"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
+    async def _get_database(self, database_id: int) -> Database:
+        """Load a database record or raise ValueError"""
+        database = await self.db.scalar(DATABASE_BY_ID, {"database_id": database_id})
+        if not database:
+            raise ValueError("Database not found")
+        return database
+    
     async def create_database(self, database_data: DatabaseCreate) -> Database:
         """Create a new database"""
-        # Create database using MySQL command
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", f"CREATE DATABASE {database_data.name};"
-        ], input=b"root_password\n", check=True)
-        
-        # Create database user
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", 
-            f"CREATE USER '{database_data.username}'@'localhost' IDENTIFIED BY '{database_data.password}';"
-        ], input=b"root_password\n", check=True)
-        
-        # Grant privileges
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", 
-            f"GRANT ALL PRIVILEGES ON {database_data.name}.* TO '{database_data.username}'@'localhost';"
-        ], input=b"root_password\n", check=True)
-        
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", "FLUSH PRIVILEGES;"
-        ], input=b"root_password\n", check=True)
+        # Create the database and its user on one pooled admin connection
+        name = mysql.quote_identifier(database_data.name)
+        await mysql.execute(
+            (f"CREATE DATABASE {name}", None),
+            ("CREATE USER %s@'localhost' IDENTIFIED BY %s", (database_data.username, database_data.password)),
+            (f"GRANT ALL PRIVILEGES ON {name}.* TO %s@'localhost'", (database_data.username,)),
+            ("FLUSH PRIVILEGES", None)
+        )
         
         # Create database record
         database = Database(
@@ -51,23 +74,21 @@ class DatabaseService:
         )
         
         self.db.add(database)
-        self.db.commit()
-        self.db.refresh(database)
+        await self.db.commit()
+        await self.db.refresh(database)
         
         return database
     
     async def update_database(self, database_id: int, database_data: DatabaseUpdate) -> Database:
         """Update a database"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+        database = await self._get_database(database_id)
         
         # Update password if provided
         if database_data.password is not None:
-            subprocess.run([
-                "mysql", "-u", "root", "-p", "-e", 
-                f"ALTER USER '{database.username}'@'localhost' IDENTIFIED BY '{database_data.password}';"
-            ], input=b"root_password\n", check=True)
+            await mysql.execute((
+                "ALTER USER %s@'localhost' IDENTIFIED BY %s",
+                (database.username, database_data.password)
+            ))
             
             database.password = database_data.password
         
@@ -75,47 +96,57 @@ class DatabaseService:
         if database_data.status is not None:
             database.status = database_data.status
         
-        self.db.commit()
-        self.db.refresh(database)
+        await self.db.commit()
+        await self.db.refresh(database)
         
         return database
     
-    async def delete_database(self, database_id: int):
-        """Delete a database"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+    async def delete_database(self, database_id: int, owner_id: Optional[int] = None) -> bool:
+        """Delete a database, optionally only if it belongs to one of owner_id's websites"""
+        # Delete the record and fetch what we need to drop it in one statement
+        stmt = delete(Database).where(Database.id == database_id)
+        if owner_id is not None:
+            stmt = stmt.where(Database.website_id.in_(
+                select(Website.id).where(Website.owner_id == owner_id)
+            ))
         
-        # Drop database
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", f"DROP DATABASE {database.name};"
-        ], input=b"root_password\n", check=True)
+        rows = await delete_returning(self.db, stmt, Database.name, Database.username)
+        if not rows:
+            return False
+        database = rows[0]
         
-        # Drop user
-        subprocess.run([
-            "mysql", "-u", "root", "-p", "-e", f"DROP USER '{database.username}'@'localhost';"
-        ], input=b"root_password\n", check=True)
+        try:
+            await self.drop_server_database(database.name, database.username)
+        except Exception:
+            # Keep the record if the server-side drop failed
+            await self.db.rollback()
+            raise
         
-        # Delete database record
-        self.db.delete(database)
-        self.db.commit()
+        await self.db.commit()
+        return True
+    
+    async def drop_server_database(self, name: str, username: str):
+        """Drop a database and its user on the MySQL server, leaving the record alone"""
+        await mysql.execute(
+            (f"DROP DATABASE {mysql.quote_identifier(name)}", None),
+            ("DROP USER %s@'localhost'", (username,))
+        )
     
     async def create_backup(self, database_id: int) -> Backup:
         """Create a backup of the database"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+        database = await self._get_database(database_id)
         
         # Create backup filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"{database.name}_{timestamp}.sql"
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
+        backup_filename = f"{database.name}_{timestamp}.sql.gz"
         backup_path = os.path.join(settings.BACKUP_PATH, backup_filename)
         
-        # Create backup using mysqldump
-        subprocess.run([
-            "mysqldump", "-u", database.username, f"-p{database.password}", 
-            database.name, "--result-file", backup_path
-        ], check=True)
+        # Create backup using mysqldump, compressing on the fly
+        await asyncio.to_thread(
+            self._dump_compressed,
+            ["mysqldump", "-u", database.username, f"-p{database.password}", database.name],
+            backup_path
+        )
         
         # Get backup size
         backup_size = os.path.getsize(backup_path)
@@ -129,96 +160,99 @@ class DatabaseService:
             status="completed"
         )
         
+        # The flush assigns the id; callers don't need the reloaded row
         self.db.add(backup)
-        self.db.commit()
-        self.db.refresh(backup)
+        await self.db.commit()
         
         return backup
     
     async def restore_backup(self, database_id: int, backup_path: str):
         """Restore a database from backup"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+        database = await self._get_database(database_id)
         
-        # Restore database from backup
-        subprocess.run([
-            "mysql", "-u", database.username, f"-p{database.password}", 
-            database.name, "<", backup_path
-        ], shell=True, check=True)
-    
-    async def get_database_stats(self, database_id: int) -> dict:
-        """Get database statistics"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+        command = ["mysql", "-u", database.username, f"-p{database.password}", database.name]
         
-        # Get database size
-        result = subprocess.run([
-            "mysql", "-u", database.username, f"-p{database.password}", "-e",
-            f"SELECT ROUND(SUM(data_length + index_length) / 1024 / 1024, 1) AS 'DB Size in MB' FROM information_schema.tables WHERE table_schema = '{database.name}';"
-        ], capture_output=True, text=True, check=True)
+        if backup_path.endswith(".gz"):
+            await asyncio.to_thread(self._restore_compressed, command, backup_path)
+        else:
+            await asyncio.to_thread(self._restore_plain, command, backup_path)
+    
+    @staticmethod
+    def _dump_compressed(command: list, backup_path: str):
+        """Pipe a dump command's output through gzip into backup_path"""
+        dump = subprocess.Popen(command, stdout=subprocess.PIPE)
+        try:
+            with gzip.open(backup_path, "wb") as out:
+                shutil.copyfileobj(dump.stdout, out, length=1 << 20)
+        finally:
+            dump.stdout.close()
+            returncode = dump.wait()
         
-        # Parse size from output
-        size_line = result.stdout.strip().split('\n')[-1]
-        size_mb = float(size_line) if size_line.replace('.', '').isdigit() else 0
+        if returncode != 0:
+            os.remove(backup_path)
+            raise subprocess.CalledProcessError(returncode, command[0])
+    
+    @staticmethod
+    def _restore_plain(command: list, backup_path: str):
+        """Feed an uncompressed dump straight to a restore command's stdin"""
+        with open(backup_path, "rb") as dump:
+            subprocess.run(command, stdin=dump, check=True)
+    
+    @staticmethod
+    def _restore_compressed(command: list, backup_path: str):
+        """Decompress backup_path into a restore command's stdin"""
+        restore = subprocess.Popen(command, stdin=subprocess.PIPE)
+        try:
+            with gzip.open(backup_path, "rb") as dump:
+                shutil.copyfileobj(dump, restore.stdin, length=1 << 20)
+        finally:
+            restore.stdin.close()
+            returncode = restore.wait()
         
-        # Get table count
-        result = subprocess.run([
-            "mysql", "-u", database.username, f"-p{database.password}", "-e",
-            f"SELECT COUNT(*) as table_count FROM information_schema.tables WHERE table_schema = '{database.name}';"
-        ], capture_output=True, text=True, check=True)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command[0])
+    
+    async def get_database_stats(self, database_id: int) -> dict:
+        """Get database statistics"""
+        database = await self._get_database(database_id)
         
-        table_count_line = result.stdout.strip().split('\n')[-1]
-        table_count = int(table_count_line) if table_count_line.isdigit() else 0
+        # Get size and table count as typed columns in one aggregate row
+        size_mb, table_count = await mysql.fetch_one(
+            "SELECT COALESCE(SUM(data_length + index_length), 0) / 1048576, COUNT(*) "
+            "FROM information_schema.tables WHERE table_schema = %s",
+            (database.name,)
+        )
         
         return {
-            "size_mb": size_mb,
-            "table_count": table_count,
+            "size_mb": round(float(size_mb), 1),
+            "table_count": int(table_count),
             "connections": 0,  # TODO: Implement connection tracking
             "queries_per_second": 0  # TODO: Implement query tracking
         }
     
     async def optimize_database(self, database_id: int):
         """Optimize database tables"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
-        
-        # Get all tables
-        result = subprocess.run([
-            "mysql", "-u", database.username, f"-p{database.password}", "-e",
-            f"SHOW TABLES FROM {database.name};"
-        ], capture_output=True, text=True, check=True)
-        
-        tables = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        # Optimize each table
-        for table in tables:
-            if table.strip():
-                subprocess.run([
-                    "mysql", "-u", database.username, f"-p{database.password}", "-e",
-                    f"OPTIMIZE TABLE {database.name}.{table.strip()};"
-                ], check=True)
+        await self._run_table_maintenance(database_id, "OPTIMIZE")
     
     async def repair_database(self, database_id: int):
         """Repair database tables"""
-        database = self.db.query(Database).filter(Database.id == database_id).first()
-        if not database:
-            raise ValueError("Database not found")
+        await self._run_table_maintenance(database_id, "REPAIR")
+    
+    async def _run_table_maintenance(self, database_id: int, command: str):
+        """Run OPTIMIZE or REPAIR over every table of a database concurrently"""
+        database = await self._get_database(database_id)
+        
+        name = mysql.quote_identifier(database.name)
         
         # Get all tables
-        result = subprocess.run([
-            "mysql", "-u", database.username, f"-p{database.password}", "-e",
-            f"SHOW TABLES FROM {database.name};"
-        ], capture_output=True, text=True, check=True)
-        
-        tables = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        # Repair each table
-        for table in tables:
-            if table.strip():
-                subprocess.run([
-                    "mysql", "-u", database.username, f"-p{database.password}", "-e",
-                    f"REPAIR TABLE {database.name}.{table.strip()};"
-                ], check=True) 
\ No newline at end of file
+        rows = await mysql.execute((f"SHOW TABLES FROM {name}", None))
+        tables = [f"{name}.{mysql.quote_identifier(row[0])}" for row in rows]
+        
+        # Leave half the pool free for other requests while tables are processed
+        limit = asyncio.Semaphore(max(1, settings.MYSQL_POOL_MAX_SIZE // 2))
+        
+        async def run(table: str):
+            async with limit:
+                await mysql.execute((f"{command} TABLE {table}", None))
+        
+        await asyncio.gather(*(run(table) for table in tables))
@@ -2,21 +2,43 @@
 Docker service for managing containers and images
 """
 
+import asyncio
 import docker
 import subprocess
 import os
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Any, List
 from app.core.config import settings
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """Get the shared Docker client, or None while the daemon is unreachable"""
+    global _client
+    
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    _client = docker.from_env()
+                except Exception:
+                    # Not cached, so the next call retries the connection
+                    return None
+    return _client
+
+
 class DockerService:
     """Service for managing Docker containers and images"""
     
-    def __init__(self):
-        try:
-            self.client = docker.from_env()
-        except Exception:
-            self.client = None
+    @property
+    def client(self):
+        """Shared Docker client"""
+        return _get_client()
     
     async def get_containers(self) -> List[Dict[str, Any]]:
         """Get all Docker containers"""
@@ -24,39 +46,63 @@ class DockerService:
             return {"error": "Docker client not available"}
         
         try:
-            containers = self.client.containers.list(all=True)
+            # The low-level summaries come back in one call; the high-level
+            # list() would inspect every container separately
+            containers = await asyncio.to_thread(self.client.api.containers, all=True)
             return [
                 {
-                    "id": container.id,
-                    "name": container.name,
-                    "status": container.status,
-                    "image": container.image.tags[0] if container.image.tags else container.image.id,
-                    "ports": container.ports,
-                    "created": container.attrs["Created"],
-                    "state": container.attrs["State"]
+                    "id": container["Id"],
+                    "name": container["Names"][0].lstrip("/") if container["Names"] else container["Id"][:12],
+                    "status": container["State"],
+                    "image": container["Image"],
+                    "ports": self._summary_ports(container["Ports"]),
+                    "created": self._summary_timestamp(container["Created"]),
+                    "state": container["Status"]
                 }
                 for container in containers
             ]
         except Exception as e:
             return {"error": str(e)}
     
+    @staticmethod
+    def _summary_ports(ports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert list-summary ports into the same mapping as Container.ports"""
+        mapping = {}
+        for port in ports or []:
+            key = f"{port['PrivatePort']}/{port['Type']}"
+            if "PublicPort" not in port:
+                mapping.setdefault(key, None)
+                continue
+            
+            if mapping.get(key) is None:
+                mapping[key] = []
+            mapping[key].append({"HostIp": port.get("IP", ""), "HostPort": str(port["PublicPort"])})
+        return mapping
+    
+    @staticmethod
+    def _summary_timestamp(created: int) -> str:
+        """Convert a list-summary epoch timestamp into ISO 8601"""
+        return datetime.fromtimestamp(created, timezone.utc).isoformat()
+    
     async def get_container(self, container_id: str) -> Dict[str, Any]:
         """Get a specific Docker container"""
         if not self.client:
             return {"error": "Docker client not available"}
         
         try:
-            container = self.client.containers.get(container_id)
+            # Everything comes from the single inspect payload; container.image
+            # would cost another request per call
+            attrs = await asyncio.to_thread(self.client.api.inspect_container, container_id)
             return {
-                "id": container.id,
-                "name": container.name,
-                "status": container.status,
-                "image": container.image.tags[0] if container.image.tags else container.image.id,
-                "ports": container.ports,
-                "created": container.attrs["Created"],
-                "state": container.attrs["State"],
-                "config": container.attrs["Config"],
-                "network_settings": container.attrs["NetworkSettings"]
+                "id": attrs["Id"],
+                "name": attrs["Name"].lstrip("/"),
+                "status": attrs["State"]["Status"],
+                "image": attrs["Config"]["Image"],
+                "ports": attrs["NetworkSettings"].get("Ports") or {},
+                "created": attrs["Created"],
+                "state": attrs["State"],
+                "config": attrs["Config"],
+                "network_settings": attrs["NetworkSettings"]
             }
         except docker.errors.NotFound:
             return {"error": "Container not found"}
@@ -69,8 +115,7 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            container = self.client.containers.get(container_id)
-            container.start()
+            await asyncio.to_thread(self.client.api.start, container_id)
             return {"success": True, "message": "Container started successfully"}
         except docker.errors.NotFound:
             return {"success": False, "error": "Container not found"}
@@ -83,8 +128,7 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            container = self.client.containers.get(container_id)
-            container.stop()
+            await asyncio.to_thread(self.client.api.stop, container_id)
             return {"success": True, "message": "Container stopped successfully"}
         except docker.errors.NotFound:
             return {"success": False, "error": "Container not found"}
@@ -97,8 +141,7 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            container = self.client.containers.get(container_id)
-            container.restart()
+            await asyncio.to_thread(self.client.api.restart, container_id)
             return {"success": True, "message": "Container restarted successfully"}
         except docker.errors.NotFound:
             return {"success": False, "error": "Container not found"}
@@ -111,8 +154,7 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            container = self.client.containers.get(container_id)
-            container.remove(force=True)
+            await asyncio.to_thread(self.client.api.remove_container, container_id, force=True)
             return {"success": True, "message": "Container deleted successfully"}
         except docker.errors.NotFound:
             return {"success": False, "error": "Container not found"}
@@ -125,14 +167,14 @@ class DockerService:
             return {"error": "Docker client not available"}
         
         try:
-            images = self.client.images.list()
+            # Same as containers: one summary call instead of one inspect per image
+            images = await asyncio.to_thread(self.client.api.images)
             return [
                 {
-                    "id": image.id,
-                    "tags": image.tags,
-                    "size": image.attrs["Size"],
-                    "created": image.attrs["Created"],
-                    "architecture": image.attrs["Architecture"]
+                    "id": image["Id"],
+                    "tags": [tag for tag in image.get("RepoTags") or [] if tag != "<none>:<none>"],
+                    "size": image["Size"],
+                    "created": self._summary_timestamp(image["Created"])
                 }
                 for image in images
             ]
@@ -145,7 +187,7 @@ class DockerService:
             if not os.path.exists(compose_file):
                 return {"success": False, "error": "Docker Compose file not found"}
             
-            result = subprocess.run([
+            result = await asyncio.to_thread(subprocess.run, [
                 "docker-compose", "-f", compose_file, "up", "-d"
             ], capture_output=True, text=True, timeout=300)
             
@@ -165,7 +207,7 @@ class DockerService:
             if not os.path.exists(compose_file):
                 return {"success": False, "error": "Docker Compose file not found"}
             
-            result = subprocess.run([
+            result = await asyncio.to_thread(subprocess.run, [
                 "docker-compose", "-f", compose_file, "down"
             ], capture_output=True, text=True, timeout=300)
             
@@ -185,7 +227,7 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            self.client.images.pull(image_name)
+            await asyncio.to_thread(self.client.images.pull, image_name)
             return {"success": True, "message": f"Image {image_name} pulled successfully"}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -196,9 +238,15 @@ class DockerService:
             return {"success": False, "error": "Docker client not available"}
         
         try:
-            self.client.images.remove(image_id, force=True)
+            await asyncio.to_thread(self.client.images.remove, image_id, force=True)
             return {"success": True, "message": "Image removed successfully"}
         except docker.errors.NotFound:
             return {"success": False, "error": "Image not found"}
         except Exception as e:
-            return {"success": False, "error": str(e)} 
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+
+@lru_cache(maxsize=1)
+def get_docker_service() -> DockerService:
+    """Get the shared Docker service instance"""
+    return DockerService()
@@ -2,131 +2,48 @@
 Email service for managing email accounts and server setup
 """
 
-import subprocess
+import asyncio
+import grp
 import os
-from typing import Dict, Any
-from sqlalchemy.orm import Session
+import pwd
+import shutil
+import time
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Set
+import aiofiles
+from passlib.hash import sha512_crypt
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import EmailAccount
+from app.core.process import run_command, apt_install
+from app.core.systemd import unit_active
+from app.schemas.email import EmailAccountCreate
 
 
-class EmailService:
-    """Service for managing email accounts and server setup"""
-    
-    def __init__(self, db: Session):
-        self.db = db
-    
-    async def create_email_account(self, email: str, password: str, domain: str, quota: int, owner_id: int) -> EmailAccount:
-        """Create a new email account"""
-        # Create email account using useradd and mailutils
-        username = email.split('@')[0]
-        
-        # Create system user
-        subprocess.run([
-            "useradd", "-m", "-s", "/bin/bash", username
-        ], check=True)
-        
-        # Set password
-        subprocess.run([
-            "echo", f"{username}:{password}", "|", "chpasswd"
-        ], shell=True, check=True)
-        
-        # Create mail directory
-        mail_dir = f"/home/{username}/Maildir"
-        subprocess.run(["mkdir", "-p", mail_dir], check=True)
-        subprocess.run(["chown", "-R", f"{username}:{username}", f"/home/{username}"], check=True)
-        
-        # Create email account record
-        account = EmailAccount(
-            email=email,
-            password=password,
-            domain=domain,
-            quota=quota,
-            owner_id=owner_id
-        )
-        
-        self.db.add(account)
-        self.db.commit()
-        self.db.refresh(account)
-        
-        return account
-    
-    async def delete_email_account(self, account_id: int):
-        """Delete an email account"""
-        account = self.db.query(EmailAccount).filter(EmailAccount.id == account_id).first()
-        if not account:
-            raise ValueError("Email account not found")
-        
-        username = account.email.split('@')[0]
-        
-        # Delete system user
-        subprocess.run([
-            "userdel", "-r", username
-        ], check=True)
-        
-        # Delete email account record
-        self.db.delete(account)
-        self.db.commit()
-    
-    async def setup_email_server(self) -> Dict[str, Any]:
-        """Setup email server (Postfix + Dovecot)"""
-        try:
-            # Install required packages
-            subprocess.run([
-                "apt-get", "update"
-            ], check=True)
-            
-            subprocess.run([
-                "apt-get", "install", "-y", "postfix", "dovecot-core", "dovecot-imapd", "dovecot-pop3d"
-            ], check=True)
-            
-            # Configure Postfix
-            await self._configure_postfix()
-            
-            # Configure Dovecot
-            await self._configure_dovecot()
-            
-            # Start and enable services
-            subprocess.run(["systemctl", "enable", "postfix"], check=True)
-            subprocess.run(["systemctl", "start", "postfix"], check=True)
-            subprocess.run(["systemctl", "enable", "dovecot"], check=True)
-            subprocess.run(["systemctl", "start", "dovecot"], check=True)
-            
-            return {"success": True, "message": "Email server setup completed"}
-        
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    async def get_server_status(self) -> Dict[str, Any]:
-        """Get email server status"""
-        try:
-            # Check Postfix status
-            postfix_status = subprocess.run([
-                "systemctl", "is-active", "postfix"
-            ], capture_output=True, text=True)
-            
-            # Check Dovecot status
-            dovecot_status = subprocess.run([
-                "systemctl", "is-active", "dovecot"
-            ], capture_output=True, text=True)
-            
-            return {
-                "postfix": {
-                    "status": "active" if postfix_status.returncode == 0 else "inactive",
-                    "running": postfix_status.returncode == 0
-                },
-                "dovecot": {
-                    "status": "active" if dovecot_status.returncode == 0 else "inactive",
-                    "running": dovecot_status.returncode == 0
-                }
-            }
-        
-        except Exception as e:
-            return {"error": str(e)}
-    
-    async def _configure_postfix(self):
-        """Configure Postfix"""
-        # Main configuration
-        main_cf = """# Basic Postfix configuration
+# Seconds a mail server status snapshot stays fresh
+STATUS_TTL = 5
+
+# Accounts provisioned at once by a batch create
+PROVISION_CONCURRENCY = 8
+
+# Mailboxes are virtual: Dovecot authenticates against a passwd-file and
+# delivers to VMAIL_HOME/<domain>/<user> as the vmail user, while Postfix
+# hands mail for the listed domains to Dovecot over LMTP
+DOVECOT_USERS_FILE = "/etc/dovecot/users"
+POSTFIX_DOMAINS_FILE = "/etc/postfix/virtual_domains"
+VMAIL_HOME = "/var/vmail"
+# Mode of the passwd-file, owned by root:dovecot
+USERS_FILE_MODE = 0o640
+
+# Prefix of every stored password hash; accounts created as Unix users
+# before the passwd-file existed hold a plaintext password instead
+HASH_PREFIX = "{SHA512-CRYPT}"
+
+# Serializes rewrites of the mailbox and domain lists
+_mailbox_lock = asyncio.Lock()
+
+# Mail server configuration files, pre-encoded for writing
+_POSTFIX_MAIN_CF = b"""# Basic Postfix configuration
 myhostname = mail.example.com
 mydomain = example.com
 myorigin = $mydomain
@@ -134,7 +51,10 @@ inet_interfaces = all
 inet_protocols = ipv4
 mydestination = $myhostname, localhost.$mydomain, localhost, $mydomain
 mynetworks = 127.0.0.0/8, 10.0.0.0/8, 172.16.0.0/12, 192.168.0.0/16
-home_mailbox = Maildir/
+virtual_mailbox_domains = /etc/postfix/virtual_domains
+virtual_transport = lmtp:unix:private/dovecot-lmtp
+smtpd_sasl_type = dovecot
+smtpd_sasl_path = private/auth
 smtpd_sasl_auth_enable = yes
 smtpd_sasl_security_options = noanonymous
 smtpd_sasl_local_domain = $myhostname
@@ -144,12 +64,8 @@ smtpd_tls_auth_only = yes
 smtpd_tls_cert_file = /etc/ssl/certs/ssl-cert-snakeoil.pem
 smtpd_tls_key_file = /etc/ssl/private/ssl-cert-snakeoil.key
 """
-        
-        with open("/etc/postfix/main.cf", "w") as f:
-            f.write(main_cf)
-        
-        # Master configuration
-        master_cf = """# Postfix master process configuration
+
+_POSTFIX_MASTER_CF = b"""# Postfix master process configuration
 smtp      inet  n       -       n       -       -       smtpd
 submission inet n       -       n       -       -       smtpd
   -o syslog_name=postfix/submission
@@ -194,43 +110,38 @@ lmtp      unix  -       -       n       -       -       lmtp
 anvil     unix  -       -       n       -       1       anvil
 scache    unix  -       -       n       -       1       scache
 """
-        
-        with open("/etc/postfix/master.cf", "w") as f:
-            f.write(master_cf)
-    
-    async def _configure_dovecot(self):
-        """Configure Dovecot"""
-        # Main configuration
-        dovecot_conf = """# Dovecot configuration
-protocols = imap pop3
+
+_DOVECOT_MAIL_CONF = b"""# Dovecot configuration
+protocols = imap pop3 lmtp
 listen = *
 mail_location = maildir:~/Maildir
 mail_privileged_group = mail
 mail_access_groups = mail
-userdb {
-  driver = passwd
+passdb {
+  driver = passwd-file
+  args = scheme=SHA512-CRYPT username_format=%u /etc/dovecot/users
 }
+# Accounts created as Unix users before the passwd-file existed
 passdb {
   driver = pam
 }
+userdb {
+  driver = passwd
+}
+userdb {
+  driver = static
+  args = uid=vmail gid=vmail home=/var/vmail/%d/%n
+}
 ssl = no
 disable_plaintext_auth = no
 """
-        
-        with open("/etc/dovecot/conf.d/10-mail.conf", "w") as f:
-            f.write(dovecot_conf)
-        
-        # Authentication configuration
-        auth_conf = """# Authentication configuration
+
+_DOVECOT_AUTH_CONF = b"""# Authentication configuration
 disable_plaintext_auth = no
 auth_mechanisms = plain login
 """
-        
-        with open("/etc/dovecot/conf.d/10-auth.conf", "w") as f:
-            f.write(auth_conf)
-        
-        # Master configuration
-        master_conf = """# Master configuration
+
+_DOVECOT_MASTER_CONF = b"""# Master configuration
 service imap-login {
   inet_listener imap {
     port = 143
@@ -242,7 +153,10 @@ service pop3-login {
   }
 }
 service lmtp {
-  unix_listener lmtp {
+  unix_listener /var/spool/postfix/private/dovecot-lmtp {
+    mode = 0600
+    user = postfix
+    group = postfix
   }
 }
 service imap {
@@ -265,6 +179,315 @@ service dict {
   }
 }
 """
+
+
+async def _write_file(path: str, content: bytes):
+    """Write a config file without blocking the event loop"""
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(content)
+
+
+def _hash_password(password: str) -> str:
+    """Hash a mailbox password in the form Dovecot's passwd-file expects"""
+    return HASH_PREFIX + sha512_crypt.hash(password)
+
+
+def _mailbox_dir(email: str) -> str:
+    """Directory Dovecot delivers an address's mail into"""
+    user, domain = email.split('@')
+    return os.path.join(VMAIL_HOME, domain, user)
+
+
+def _add_domains(domains: Set[str]) -> bool:
+    """Add domains to Postfix's virtual domain list, returning whether it changed"""
+    try:
+        with open(POSTFIX_DOMAINS_FILE) as f:
+            known = set(f.read().split())
+    except FileNotFoundError:
+        known = set()
+
+    missing = sorted(domains - known)
+    if missing:
+        with open(POSTFIX_DOMAINS_FILE, "a") as f:
+            f.write("".join(f"{domain}\n" for domain in missing))
+    return bool(missing)
+
+
+def _open_users_file(path: str, append: bool = False):
+    """Open a passwd-file for writing, readable only by root and Dovecot's auth processes"""
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(path, flags, USERS_FILE_MODE)
+    try:
+        # Tighten an existing file too, before any hash is written to it
+        os.fchmod(fd, USERS_FILE_MODE)
+        try:
+            os.fchown(fd, 0, grp.getgrnam("dovecot").gr_gid)
+        except KeyError:
+            # Dovecot isn't installed yet; root alone can read it meanwhile
+            os.fchown(fd, 0, 0)
+    except BaseException:
+        os.close(fd)
+        raise
+    return os.fdopen(fd, "a" if append else "w")
+
+
+def _replace_users_file(lines: List[str]):
+    """Swap in a new passwd-file atomically so Dovecot never reads a partial list"""
+    tmp_path = DOVECOT_USERS_FILE + ".tmp"
+    with _open_users_file(tmp_path) as f:
+        f.writelines(lines)
+    os.replace(tmp_path, DOVECOT_USERS_FILE)
+
+
+def _add_mailboxes(hashes: Dict[str, str]):
+    """Add addresses to Dovecot's passwd-file, replacing any existing entry"""
+    try:
+        with open(DOVECOT_USERS_FILE) as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        lines = []
+
+    new_lines = [f"{email}:{hashed}\n" for email, hashed in hashes.items()]
+    kept = [line for line in lines if line.split(":", 1)[0] not in hashes]
+    if len(kept) == len(lines):
+        # Nothing to replace, so a plain append will do
+        with _open_users_file(DOVECOT_USERS_FILE, append=True) as f:
+            f.writelines(new_lines)
+    else:
+        _replace_users_file(kept + new_lines)
+
+
+def _remove_mailboxes(emails: Set[str]):
+    """Drop addresses from Dovecot's passwd-file and delete their mail"""
+    with open(DOVECOT_USERS_FILE) as f:
+        lines = f.readlines()
+
+    _replace_users_file([line for line in lines if line.split(":", 1)[0] not in emails])
+
+    for email in emails:
+        shutil.rmtree(_mailbox_dir(email), ignore_errors=True)
+
+
+class EmailService:
+    """Service for managing email accounts and server setup"""
+    
+    def __init__(self):
+        self._status: Optional[Dict[str, Any]] = None
+        self._status_at = 0.0
+    
+    async def create_email_account(self, db: AsyncSession, email: str, password: str, domain: str, quota: int, owner_id: int) -> EmailAccount:
+        """Create a new email account"""
+        # crypt is deliberately slow, so keep it off the event loop
+        hashed = await asyncio.to_thread(_hash_password, password)
+        
+        # Create email account record
+        account = EmailAccount(
+            email=email,
+            password=hashed,
+            domain=domain,
+            quota=quota,
+            owner_id=owner_id
+        )
+        
+        db.add(account)
+        await db.commit()
+        await db.refresh(account)
+        
+        # Register the login only once the row is committed, so a failed
+        # commit never leaves a working mailbox behind
+        try:
+            await self._add_mailboxes({email: hashed})
+        except Exception:
+            await db.delete(account)
+            await db.commit()
+            raise
+        
+        return account
+    
+    async def create_email_accounts(self, db: AsyncSession, items: List[EmailAccountCreate], owner_id: int) -> List[EmailAccount]:
+        """Create several email accounts with a single commit"""
+        semaphore = asyncio.Semaphore(PROVISION_CONCURRENCY)
+        
+        async def hash_password(password: str) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(_hash_password, password)
+        
+        hashes = await asyncio.gather(*(hash_password(item.password) for item in items))
         
-        with open("/etc/dovecot/conf.d/10-master.conf", "w") as f:
-            f.write(master_conf) 
\ No newline at end of file
+        accounts = [
+            EmailAccount(
+                email=item.email,
+                password=hashed,
+                domain=item.domain,
+                quota=item.quota,
+                owner_id=owner_id
+            )
+            for item, hashed in zip(items, hashes)
+        ]
+        
+        db.add_all(accounts)
+        await db.commit()
+        
+        # As in create_email_account, the logins follow the committed rows
+        try:
+            await self._add_mailboxes({item.email: hashed for item, hashed in zip(items, hashes)})
+        except Exception:
+            await db.execute(
+                delete(EmailAccount).where(EmailAccount.id.in_([account.id for account in accounts]))
+            )
+            await db.commit()
+            raise
+        
+        # Reload the server-side defaults for the whole batch in one query
+        result = await db.scalars(
+            select(EmailAccount)
+            .where(EmailAccount.id.in_([account.id for account in accounts]))
+            .order_by(EmailAccount.id)
+        )
+        return result.all()
+    
+    async def _add_mailboxes(self, hashes: Dict[str, str]):
+        """Register addresses with Dovecot and their domains with Postfix"""
+        async with _mailbox_lock:
+            # Dovecot re-reads the passwd-file when it changes, so no reload is needed
+            await asyncio.to_thread(_add_mailboxes, hashes)
+            
+            domains = {email.split('@')[1] for email in hashes}
+            if await asyncio.to_thread(_add_domains, domains):
+                await run_command("postfix", "reload")
+    
+    async def _remove_mailboxes(self, emails: Iterable[str]):
+        """Unregister addresses from Dovecot and delete their mail"""
+        async with _mailbox_lock:
+            await asyncio.to_thread(_remove_mailboxes, set(emails))
+    
+    async def _remove_unix_users(self, accounts: Iterable):
+        """Remove the Unix users behind accounts created before the passwd-file"""
+        for account in accounts:
+            if not account.password.startswith(HASH_PREFIX):
+                # As the user may already be gone, a failure isn't fatal
+                await run_command("userdel", "-r", account.email.split('@')[0])
+    
+    async def delete_email_account(self, db: AsyncSession, account_id: int):
+        """Delete an email account"""
+        account = (await db.execute(
+            select(EmailAccount.email, EmailAccount.password).where(EmailAccount.id == account_id)
+        )).first()
+        if not account:
+            raise ValueError("Email account not found")
+        
+        # Delete email account record first; a failed commit must not have
+        # already thrown the mail away
+        await db.execute(delete(EmailAccount).where(EmailAccount.id == account_id))
+        await db.commit()
+        
+        await self._remove_mailboxes([account.email])
+        await self._remove_unix_users([account])
+    
+    async def delete_email_accounts(self, db: AsyncSession, account_ids: List[int]):
+        """Delete several email accounts with a single statement"""
+        accounts = (await db.execute(
+            select(EmailAccount.email, EmailAccount.password).where(EmailAccount.id.in_(account_ids))
+        )).all()
+        
+        # As in delete_email_account, the mail only goes once the rows have
+        await db.execute(delete(EmailAccount).where(EmailAccount.id.in_(account_ids)))
+        await db.commit()
+        
+        await self._remove_mailboxes([account.email for account in accounts])
+        await self._remove_unix_users(accounts)
+    
+    async def setup_email_server(self) -> Dict[str, Any]:
+        """Setup email server (Postfix + Dovecot)"""
+        try:
+            # Install required packages
+            await apt_install(
+                "postfix", "dovecot-core", "dovecot-imapd", "dovecot-pop3d", "dovecot-lmtpd"
+            )
+            
+            await self._setup_vmail()
+            
+            # Configure Postfix and Dovecot concurrently
+            await asyncio.gather(self._configure_postfix(), self._configure_dovecot())
+            
+            # Start and enable both services concurrently
+            await asyncio.gather(
+                run_command("systemctl", "enable", "--now", "postfix", check=True),
+                run_command("systemctl", "enable", "--now", "dovecot", check=True)
+            )
+            self._status = None
+            
+            return {"success": True, "message": "Email server setup completed"}
+        
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def _setup_vmail(self):
+        """Create the vmail user and the mailbox and domain lists"""
+        try:
+            pwd.getpwnam("vmail")
+        except KeyError:
+            await run_command(
+                "useradd", "--system", "--user-group", "--create-home",
+                "--home-dir", VMAIL_HOME, "--shell", "/usr/sbin/nologin", "vmail",
+                check=True
+            )
+        
+        for path in (DOVECOT_USERS_FILE, POSTFIX_DOMAINS_FILE):
+            async with aiofiles.open(path, "a"):
+                pass
+        
+        # Hashes are only readable by root and Dovecot's auth processes
+        await asyncio.to_thread(os.chmod, DOVECOT_USERS_FILE, USERS_FILE_MODE)
+        await asyncio.to_thread(shutil.chown, DOVECOT_USERS_FILE, "root", "dovecot")
+    
+    async def get_server_status(self) -> Dict[str, Any]:
+        """Get email server status"""
+        # Service health changes slowly, so reuse a recent snapshot
+        if self._status is not None and time.monotonic() - self._status_at < STATUS_TTL:
+            return self._status
+        
+        try:
+            # Check Postfix and Dovecot concurrently
+            postfix_active, dovecot_active = await asyncio.gather(
+                unit_active("postfix.service"),
+                unit_active("dovecot.service")
+            )
+        
+        except Exception as e:
+            return {"error": str(e)}
+        
+        self._status = {
+            "postfix": {
+                "status": "active" if postfix_active else "inactive",
+                "running": postfix_active
+            },
+            "dovecot": {
+                "status": "active" if dovecot_active else "inactive",
+                "running": dovecot_active
+            }
+        }
+        self._status_at = time.monotonic()
+        
+        return self._status
+    
+    async def _configure_postfix(self):
+        """Configure Postfix"""
+        await asyncio.gather(
+            _write_file("/etc/postfix/main.cf", _POSTFIX_MAIN_CF),
+            _write_file("/etc/postfix/master.cf", _POSTFIX_MASTER_CF)
+        )
+    
+    async def _configure_dovecot(self):
+        """Configure Dovecot"""
+        await asyncio.gather(
+            _write_file("/etc/dovecot/conf.d/10-mail.conf", _DOVECOT_MAIL_CONF),
+            _write_file("/etc/dovecot/conf.d/10-auth.conf", _DOVECOT_AUTH_CONF),
+            _write_file("/etc/dovecot/conf.d/10-master.conf", _DOVECOT_MASTER_CONF)
+        )
+
+
+@lru_cache(maxsize=1)
+def get_email_service() -> EmailService:
+    """Get the shared email service instance"""
+    return EmailService()
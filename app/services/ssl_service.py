@@ -2,57 +2,125 @@
 SSL service for managing SSL certificates
 """
 
+import asyncio
 import subprocess
 import os
-from typing import Dict, Any
+import shutil
+from typing import Dict, Any, List, Optional, Tuple
+from cryptography import x509
 from app.core.config import settings
+from app.core.process import run_command, apt_install
+from app.services import acme_service
+from app.services.acme_service import ACME_AVAILABLE
+from app.services.web_server_service import get_web_server_service
+
+# Certbot runs in flight at once when installing for several domains
+CERTBOT_CONCURRENCY = 8
+
+# Certbot runs this only after it actually deploys a new or renewed certificate
+RELOAD_HOOK_PATH = "/usr/local/bin/reload-web.sh"
+
+_reload_hook_ready = False
+
+# Certificates issued in-process live under the panel's own directory so
+# certbot never mistakes them for lineages it manages; domains certbot
+# already holds a certificate for stay with certbot
+CERT_LIVE_DIR = settings.ACME_CERT_DIR
+CERTBOT_LIVE_DIR = "/etc/letsencrypt/live"
+
+# Seconds between sweeps for in-process issued certificates due for renewal
+RENEWAL_INTERVAL = 12 * 60 * 60
+
+# Parsed certificate details keyed by (cert_path, mtime_ns)
+_CERT_CACHE: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+
+def _in_process(domain: str) -> bool:
+    """Whether a domain's certificate is issued in-process rather than by certbot"""
+    if not ACME_AVAILABLE:
+        return False
+    if os.path.exists(os.path.join(CERT_LIVE_DIR, domain, "cert.pem")):
+        return True
+    return not os.path.exists(os.path.join(CERTBOT_LIVE_DIR, domain, "cert.pem"))
+
+
+def _live_dir(domain: str) -> str:
+    """Directory holding a domain's certificate, chain and key"""
+    return os.path.join(CERT_LIVE_DIR if _in_process(domain) else CERTBOT_LIVE_DIR, domain)
+
+
+def _cert_path(domain: str) -> str:
+    """Path of the leaf certificate for a domain"""
+    return os.path.join(_live_dir(domain), "cert.pem")
+
+
+def _webroot(domain: str) -> str:
+    """Document root that answers a domain's HTTP-01 challenges"""
+    return f"{settings.BASE_DIR}/{domain.split('.')[0]}"
+
+
+def _write_reload_hook():
+    """Install the certbot deploy hook that reloads the web server"""
+    unit = "apache2" if settings.WEB_SERVER == "apache" else settings.WEB_SERVER
+    with open(RELOAD_HOOK_PATH, "w") as f:
+        f.write(f"#!/bin/sh\n# Reload the web server after certbot deploys a certificate\nsystemctl reload {unit}\n")
+    os.chmod(RELOAD_HOOK_PATH, 0o755)
+
+
+def _forget_certificate(domain: str):
+    """Drop cached certificate details for a domain"""
+    paths = {os.path.join(live, domain, "cert.pem") for live in (CERT_LIVE_DIR, CERTBOT_LIVE_DIR)}
+    for key in [key for key in _CERT_CACHE if key[0] in paths]:
+        del _CERT_CACHE[key]
 
 
 class SSLService:
     """Service for managing SSL certificates"""
     
+    _renewal_task: Optional[asyncio.Task] = None
+    
     def __init__(self, db=None):
         self.db = db
     
-    async def install_ssl(self, domain: str) -> Dict[str, Any]:
+    async def install_ssl(self, domain: str, reload: bool = True) -> Dict[str, Any]:
         """Install SSL certificate using Let's Encrypt"""
         try:
-            # Check if certbot is installed
-            if not self._is_certbot_installed():
-                await self._install_certbot()
+            in_process = _in_process(domain)
+            if in_process:
+                # Issue in-process instead of starting a certbot interpreter
+                await asyncio.to_thread(
+                    acme_service.issue_certificate,
+                    [domain, f"www.{domain}"], _webroot(domain), _live_dir(domain)
+                )
+            else:
+                error = await self._certbot_certonly(domain)
+                if error is not None:
+                    return {
+                        "success": False,
+                        "message": f"Failed to install SSL certificate: {error}",
+                        "error": error
+                    }
             
-            # Install SSL certificate
-            result = subprocess.run([
-                "certbot", "certonly", "--webroot",
-                "--webroot-path", f"{settings.BASE_DIR}/{domain.split('.')[0]}",
-                "--email", settings.CERTBOT_EMAIL or "admin@localhost",
-                "--agree-tos", "--no-eff-email",
-                "--domains", domain, f"www.{domain}",
-                "--non-interactive"
-            ], capture_output=True, text=True)
+            # Certificate installed successfully
+            _forget_certificate(domain)
+            cert_path = os.path.join(_live_dir(domain), "fullchain.pem")
+            key_path = os.path.join(_live_dir(domain), "privkey.pem")
             
-            if result.returncode == 0:
-                # Certificate installed successfully
-                cert_path = f"/etc/letsencrypt/live/{domain}/fullchain.pem"
-                key_path = f"/etc/letsencrypt/live/{domain}/privkey.pem"
-                
-                # Update web server configuration
-                web_server_service = WebServerService()
-                await web_server_service.install_ssl(domain, cert_path, key_path)
+            # Update web server configuration. Certbot's deploy hook covers a
+            # new certificate, so there only a changed vhost needs a reload
+            web_server_service = get_web_server_service()
+            config_changed = await web_server_service.install_ssl(domain, cert_path, key_path)
+            reload_required = in_process or config_changed
+            if reload_required and reload:
                 await web_server_service.reload()
-                
-                return {
-                    "success": True,
-                    "message": "SSL certificate installed successfully",
-                    "cert_path": cert_path,
-                    "key_path": key_path
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": f"Failed to install SSL certificate: {result.stderr}",
-                    "error": result.stderr
-                }
+            
+            return {
+                "success": True,
+                "message": "SSL certificate installed successfully",
+                "cert_path": cert_path,
+                "key_path": key_path,
+                "reload_required": reload_required
+            }
         
         except Exception as e:
             return {
@@ -61,18 +129,67 @@ class SSLService:
                 "error": str(e)
             }
     
+    async def _certbot_certonly(self, domain: str) -> Optional[str]:
+        """Obtain a certificate with the certbot command line, returning an error if it failed"""
+        # Check if certbot is installed
+        if not self._is_certbot_installed():
+            await self._install_certbot()
+        
+        await self._ensure_reload_hook()
+        
+        # An unchanged certificate triggers no reload
+        result = await run_command(
+            "certbot", "certonly", "--webroot",
+            "--webroot-path", _webroot(domain),
+            "--email", settings.CERTBOT_EMAIL or "admin@localhost",
+            "--agree-tos", "--no-eff-email",
+            "--cert-name", domain, "-d", domain, "-d", f"www.{domain}",
+            "--deploy-hook", RELOAD_HOOK_PATH,
+            "--non-interactive",
+            capture=True
+        )
+        return result.stderr if result.returncode != 0 else None
+    
+    async def install_ssl_many(self, domains: List[str], concurrency: int = CERTBOT_CONCURRENCY) -> Dict[str, Dict[str, Any]]:
+        """Install SSL certificates for several domains, reloading the web server once"""
+        # Install certbot up front so concurrent installs don't race to do it
+        if not all(_in_process(domain) for domain in domains):
+            if not self._is_certbot_installed():
+                await self._install_certbot()
+            await self._ensure_reload_hook()
+        
+        # Bounded to stay clear of Let's Encrypt rate limits
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def install(domain: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.install_ssl(domain, reload=False)
+        
+        results = await asyncio.gather(*(install(domain) for domain in domains))
+        
+        if any(result.get("reload_required") for result in results):
+            await get_web_server_service().reload()
+        
+        return dict(zip(domains, results))
+    
     async def renew_ssl(self, domain: str) -> Dict[str, Any]:
         """Renew SSL certificate"""
         try:
-            result = subprocess.run([
+            if _in_process(domain):
+                return await self._renew_in_process(domain)
+            
+            await self._ensure_reload_hook()
+            
+            # The deploy hook reloads the web server only if a certificate was renewed
+            result = await run_command(
                 "certbot", "renew", "--cert-name", domain,
-                "--non-interactive"
-            ], capture_output=True, text=True)
+                "--deploy-hook", RELOAD_HOOK_PATH,
+                "--non-interactive",
+                capture=True
+            )
             
             if result.returncode == 0:
-                # Reload web server after renewal
-                web_server_service = WebServerService()
-                await web_server_service.reload()
+                _forget_certificate(domain)
                 
                 return {
                     "success": True,
@@ -92,15 +209,57 @@ class SSLService:
                 "error": str(e)
             }
     
+    async def _renew_in_process(self, domain: str) -> Dict[str, Any]:
+        """Re-issue an in-process certificate once it is due for renewal"""
+        # needs_renewal treats a missing file as due; renewing must never
+        # issue a first certificate for a domain that has none
+        if not os.path.exists(_cert_path(domain)):
+            return {
+                "success": False,
+                "message": "Certificate not found",
+                "error": "Certificate not found"
+            }
+        
+        if not await asyncio.to_thread(acme_service.needs_renewal, _cert_path(domain)):
+            return {
+                "success": True,
+                "message": "SSL certificate is not yet due for renewal"
+            }
+        
+        await asyncio.to_thread(
+            acme_service.issue_certificate,
+            [domain, f"www.{domain}"], _webroot(domain), _live_dir(domain)
+        )
+        _forget_certificate(domain)
+        
+        await get_web_server_service().reload()
+        
+        return {
+            "success": True,
+            "message": "SSL certificate renewed successfully"
+        }
+    
     async def revoke_ssl(self, domain: str) -> Dict[str, Any]:
         """Revoke SSL certificate"""
         try:
-            result = subprocess.run([
-                "certbot", "revoke", "--cert-path", f"/etc/letsencrypt/live/{domain}/cert.pem",
-                "--non-interactive"
-            ], capture_output=True, text=True)
+            if _in_process(domain):
+                await asyncio.to_thread(acme_service.revoke_certificate, _cert_path(domain))
+                _forget_certificate(domain)
+                
+                return {
+                    "success": True,
+                    "message": "SSL certificate revoked successfully"
+                }
+            
+            result = await run_command(
+                "certbot", "revoke", "--cert-path", _cert_path(domain),
+                "--non-interactive",
+                capture=True
+            )
             
             if result.returncode == 0:
+                _forget_certificate(domain)
+                
                 return {
                     "success": True,
                     "message": "SSL certificate revoked successfully"
@@ -119,33 +278,28 @@ class SSLService:
                 "error": str(e)
             }
     
+    async def _ensure_reload_hook(self):
+        """Make sure the certbot deploy hook is in place"""
+        global _reload_hook_ready
+        
+        if not _reload_hook_ready:
+            await asyncio.to_thread(_write_reload_hook)
+            _reload_hook_ready = True
+    
     def _is_certbot_installed(self) -> bool:
         """Check if certbot is installed"""
-        try:
-            result = subprocess.run(["certbot", "--version"], capture_output=True)
-            return result.returncode == 0
-        except FileNotFoundError:
-            return False
+        return shutil.which("certbot") is not None
     
     async def _install_certbot(self):
         """Install certbot"""
         try:
-            # Update package list
-            subprocess.run(["apt-get", "update"], check=True)
-            
             # Install certbot
             if settings.WEB_SERVER == "nginx":
-                subprocess.run([
-                    "apt-get", "install", "-y", "certbot", "python3-certbot-nginx"
-                ], check=True)
+                await apt_install("certbot", "python3-certbot-nginx")
             elif settings.WEB_SERVER == "apache":
-                subprocess.run([
-                    "apt-get", "install", "-y", "certbot", "python3-certbot-apache"
-                ], check=True)
+                await apt_install("certbot", "python3-certbot-apache")
             else:
-                subprocess.run([
-                    "apt-get", "install", "-y", "certbot"
-                ], check=True)
+                await apt_install("certbot")
         
         except subprocess.CalledProcessError as e:
             raise Exception(f"Failed to install certbot: {e}")
@@ -153,31 +307,28 @@ class SSLService:
     async def get_certificate_info(self, domain: str) -> Dict[str, Any]:
         """Get SSL certificate information"""
         try:
-            cert_path = f"/etc/letsencrypt/live/{domain}/cert.pem"
+            cert_path = _cert_path(domain)
             
-            if not os.path.exists(cert_path):
+            try:
+                st = os.stat(cert_path)
+            except FileNotFoundError:
                 return {
                     "success": False,
                     "message": "Certificate not found"
                 }
             
-            # Get certificate details
-            result = subprocess.run([
-                "openssl", "x509", "-in", cert_path, "-text", "-noout"
-            ], capture_output=True, text=True)
+            # Certificates only change on renew/revoke, which also bumps the mtime
+            key = (cert_path, st.st_mtime_ns)
+            info = _CERT_CACHE.get(key)
+            if info is None:
+                info = self._read_certificate(cert_path)
+                _CERT_CACHE[key] = info
             
-            if result.returncode == 0:
-                return {
-                    "success": True,
-                    "certificate_info": result.stdout,
-                    "cert_path": cert_path
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": "Failed to read certificate information",
-                    "error": result.stderr
-                }
+            return {
+                "success": True,
+                "certificate_info": info,
+                "cert_path": cert_path
+            }
         
         except Exception as e:
             return {
@@ -186,19 +337,42 @@ class SSLService:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _read_certificate(cert_path: str) -> Dict[str, Any]:
+        """Parse the details of a PEM certificate"""
+        with open(cert_path, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+        
+        return {
+            "subject": cert.subject.rfc4514_string(),
+            "issuer": cert.issuer.rfc4514_string(),
+            "not_valid_before": cert.not_valid_before_utc.isoformat(),
+            "not_valid_after": cert.not_valid_after_utc.isoformat(),
+            "serial_number": format(cert.serial_number, "x")
+        }
+    
     async def setup_auto_renewal(self):
         """Setup automatic SSL certificate renewal"""
+        if ACME_AVAILABLE and not os.path.isdir(CERTBOT_LIVE_DIR):
+            # certbot renew doesn't know in-process certificates; the
+            # panel's own renewal task covers them. Existing certbot
+            # lineages still need the cron job below
+            return {
+                "success": True,
+                "message": "Certificates are renewed automatically by the panel"
+            }
+        
         try:
-            # Create renewal script
+            await self._ensure_reload_hook()
+            
+            # Create renewal script; the deploy hook reloads the web server
+            # only when a certificate was actually renewed
             renewal_script = """#!/bin/bash
 # Auto-renewal script for SSL certificates
 
 # Renew certificates
-certbot renew --quiet
-
-# Reload web server
-systemctl reload {web_server}
-""".format(web_server=settings.WEB_SERVER)
+certbot renew --quiet --deploy-hook {reload_hook}
+""".format(reload_hook=RELOAD_HOOK_PATH)
             
             script_path = "/usr/local/bin/ssl-renew.sh"
             with open(script_path, "w") as f:
@@ -211,8 +385,12 @@ systemctl reload {web_server}
             cron_job = f"0 0,12 * * * {script_path}"
             
             # Add to current user's crontab
-            subprocess.run(["crontab", "-l"], capture_output=True)
-            subprocess.run(["echo", cron_job, "|", "crontab", "-"], shell=True)
+            current = await run_command("crontab", "-l", capture=True)
+            crontab = current.stdout if current.returncode == 0 else ""
+            if cron_job not in crontab:
+                if crontab and not crontab.endswith("\n"):
+                    crontab += "\n"
+                await run_command("crontab", "-", input=crontab + cron_job + "\n", check=True)
             
             return {
                 "success": True,
@@ -225,7 +403,36 @@ systemctl reload {web_server}
                 "message": f"Error setting up auto-renewal: {str(e)}",
                 "error": str(e)
             }
-
-
-# Import at the end to avoid circular imports
-from app.services.web_server_service import WebServerService 
\ No newline at end of file
+    
+    @classmethod
+    def start_auto_renewal(cls):
+        """Start renewing in-process issued certificates in the background"""
+        if ACME_AVAILABLE and cls._renewal_task is None:
+            cls._renewal_task = asyncio.create_task(cls._renewal_loop())
+    
+    @classmethod
+    def stop_auto_renewal(cls):
+        """Stop the background certificate renewal"""
+        if cls._renewal_task:
+            cls._renewal_task.cancel()
+            cls._renewal_task = None
+    
+    @classmethod
+    async def _renewal_loop(cls):
+        """Renewal loop"""
+        service = cls()
+        while True:
+            try:
+                domains = await asyncio.to_thread(
+                    lambda: os.listdir(CERT_LIVE_DIR) if os.path.isdir(CERT_LIVE_DIR) else []
+                )
+                for domain in domains:
+                    result = await service.renew_ssl(domain)
+                    if not result["success"]:
+                        print(f"SSL renewal error for {domain}: {result['error']}")
+                await asyncio.sleep(RENEWAL_INTERVAL)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"SSL renewal error: {e}")
+                await asyncio.sleep(RENEWAL_INTERVAL)
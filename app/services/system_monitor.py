@@ -6,9 +6,103 @@ import psutil
 import subprocess
 import asyncio
 import os
+import re
+import shutil
+import socket
+import time
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, Tuple, AsyncIterator, BinaryIO
 from app.core.config import settings
+from app.core.process import apt_update, run_apt, run_command
+
+# Ubuntu's update-notifier helper; prints "<updates>;<security updates>" to stderr
+APT_CHECK = "/usr/lib/update-notifier/apt-check"
+# Seconds an update check, and the package index behind it, stays fresh
+UPDATES_TTL = 900
+
+# apt-get's summary line, e.g. "12 upgraded, 0 newly installed, 0 to remove ..."
+_UPGRADED_RE = re.compile(r"^(\d+) upgraded", re.MULTILINE)
+
+# Seconds to wait on one mount's statvfs; a hung NFS/CIFS mount never answers
+DISK_USAGE_TIMEOUT = 1.0
+# Mounts whose usage says nothing about disk space
+_PSEUDO_FSTYPES = {"squashfs", "tmpfs", "devtmpfs", "overlay"}
+
+# Bytes read per step when scanning a log backwards from its end
+TAIL_BLOCK = 8192
+
+# Seconds the network interface listing stays fresh
+INTERFACES_TTL = 60.0
+
+# Services reported by the services endpoint
+MONITORED_SERVICES = [
+    settings.WEB_SERVER,  # nginx or apache
+    "mysql",  # or mariadb
+    "php-fpm",
+    "docker",
+    "redis"
+]
+# Seconds the list of installed unit files stays fresh
+UNIT_FILES_TTL = 600.0
+
+# Seconds a socket count stays fresh; counting walks every process's fds
+CONNECTIONS_TTL = 5.0
+
+_interfaces: Optional[Dict[str, Any]] = None
+_interfaces_read_at = 0.0
+
+_connections = 0
+_connections_counted_at: Optional[float] = None
+
+
+@lru_cache(maxsize=1)
+def _cpu_count() -> int:
+    """Logical CPU count; fixed for the life of the process"""
+    return psutil.cpu_count()
+
+
+def _tail(f: BinaryIO, lines: int) -> bytes:
+    """Return the last lines of an open file like tail -n, reading only its end"""
+    if lines <= 0:
+        return b""
+
+    pos = f.seek(0, os.SEEK_END)
+    data = b""
+    # One newline more than asked for, since the file normally ends with one
+    while pos > 0 and data.count(b"\n") <= lines:
+        size = min(TAIL_BLOCK, pos)
+        pos -= size
+        f.seek(pos)
+        data = f.read(size) + data
+
+    return b"".join(data.splitlines(keepends=True)[-lines:])
+
+
+def _connection_count() -> int:
+    """Count inet sockets, recounting at most every CONNECTIONS_TTL seconds"""
+    global _connections, _connections_counted_at
+
+    if _connections_counted_at is None or time.monotonic() - _connections_counted_at >= CONNECTIONS_TTL:
+        _connections = len(psutil.net_connections(kind="inet"))
+        _connections_counted_at = time.monotonic()
+    return _connections
+
+
+def _network_interfaces() -> Dict[str, Any]:
+    """List interface addresses, re-reading them at most every INTERFACES_TTL seconds"""
+    global _interfaces, _interfaces_read_at
+
+    if _interfaces is None or time.monotonic() - _interfaces_read_at >= INTERFACES_TTL:
+        _interfaces = {
+            interface: {
+                "addresses": [addr.address for addr in addresses if addr.family == socket.AF_INET],
+                "mac": next((addr.address for addr in addresses if addr.family == psutil.AF_LINK), None)
+            }
+            for interface, addresses in psutil.net_if_addrs().items()
+        }
+        _interfaces_read_at = time.monotonic()
+    return _interfaces
 
 
 class SystemMonitor:
@@ -26,6 +120,11 @@ class SystemMonitor:
         if not hasattr(self, 'initialized'):
             self.initialized = True
             self.monitoring_data = {}
+            self._cache = {}
+            self._updates = None
+            self._updates_checked_at = 0.0
+            self._known_units = None
+            self._known_units_read_at = 0.0
     
     @classmethod
     def start(cls):
@@ -44,80 +143,173 @@ class SystemMonitor:
     async def _monitor_loop(cls):
         """Monitoring loop"""
         monitor = cls()
+        interval = settings.MONITORING_INTERVAL
+        # Ticks are scheduled against a monotonic deadline so the time spent
+        # collecting doesn't stretch the gap between samples
+        next_tick = time.monotonic()
         while True:
             try:
-                # Update monitoring data
-                monitor.monitoring_data = await monitor._collect_system_data()
-                await asyncio.sleep(settings.MONITORING_INTERVAL)
+                # One sample per tick feeds every status endpoint
+                await monitor._refresh_snapshots()
+                
+                next_tick += interval
+                now = time.monotonic()
+                if next_tick < now:
+                    # Missed the deadline; restart the cadence from now rather
+                    # than firing the missed ticks back to back
+                    next_tick = now + interval
+                await asyncio.sleep(next_tick - now)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 print(f"Monitoring error: {e}")
                 await asyncio.sleep(60)  # Wait before retrying
+                next_tick = time.monotonic()
     
     async def get_system_status(self) -> Dict[str, Any]:
         """Get overall system status"""
+        return await self._get_snapshot("status", self._collect_status)
+    
+    async def get_resource_usage(self) -> Dict[str, Any]:
+        """Get detailed resource usage"""
+        return await self._get_snapshot("resources", self._collect_resources)
+    
+    async def get_services_status(self) -> Dict[str, Any]:
+        """Get status of system services"""
+        return await self._get_snapshot("services", self._collect_services)
+    
+    async def _get_snapshot(self, key: str, collector) -> Dict[str, Any]:
+        """Return the cached snapshot, collecting it on demand before the first refresh"""
+        snapshot = self._cache.get(key)
+        if snapshot is None:
+            snapshot = await collector()
+            self._cache[key] = snapshot
+        return snapshot
+    
+    async def _refresh_snapshots(self):
+        """Sample the system once and rebuild every cached snapshot from it"""
+        self.monitoring_data = await self._collect_system_data()
+        self._cache["status"] = self._status_view(self.monitoring_data)
+        self._cache["resources"] = self._resources_view(self.monitoring_data)
+        self._cache["services"] = await self._collect_services()
+    
+    async def _sample(self) -> Dict[str, Any]:
+        """Return the monitoring loop's latest sample, taking one if it hasn't run yet"""
+        if not self.monitoring_data:
+            self.monitoring_data = await self._collect_system_data()
+        return self.monitoring_data
+    
+    async def _collect_status(self) -> Dict[str, Any]:
+        """Collect overall system status"""
+        return self._status_view(await self._sample())
+    
+    async def _collect_resources(self) -> Dict[str, Any]:
+        """Collect detailed resource usage"""
+        return self._resources_view(await self._sample())
+    
+    def _status_view(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the system status report from a sample"""
+        mem = data["memory"]
+        disk = data["root_disk"]
+        net_io = data["net_io"]
+        
         return {
             "status": "healthy",
-            "uptime": self._get_uptime(),
-            "load_average": self._get_load_average(),
-            "memory_usage": self._get_memory_usage(),
-            "disk_usage": self._get_disk_usage(),
-            "cpu_usage": self._get_cpu_usage(),
-            "network_status": self._get_network_status(),
-            "timestamp": datetime.utcnow().isoformat()
+            "uptime": data["uptime"],
+            "load_average": data["load_average"],
+            "memory_usage": {
+                "total": mem.total,
+                "used": mem.used,
+                "available": mem.available,
+                "percent": mem.percent
+            },
+            "disk_usage": {
+                "total": disk.total,
+                "used": disk.used,
+                "free": disk.free,
+                "percent": disk.percent
+            },
+            "cpu_usage": data["cpu_usage"],
+            "network_status": {
+                "bytes_sent": net_io.bytes_sent,
+                "bytes_recv": net_io.bytes_recv,
+                "packets_sent": net_io.packets_sent,
+                "packets_recv": net_io.packets_recv
+            },
+            "timestamp": data["timestamp"]
         }
     
-    async def get_resource_usage(self) -> Dict[str, Any]:
-        """Get detailed resource usage"""
+    def _resources_view(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the detailed resource report from a sample"""
+        mem = data["memory"]
+        freq = data["cpu_freq"]
+        disk_io = data["disk_io"]
+        
         return {
             "cpu": {
-                "usage_percent": psutil.cpu_percent(interval=1),
-                "count": psutil.cpu_count(),
-                "frequency": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
+                "usage_percent": data["cpu_usage"],
+                "count": _cpu_count(),
+                "frequency": freq._asdict() if freq else None
             },
             "memory": {
-                "total": psutil.virtual_memory().total,
-                "available": psutil.virtual_memory().available,
-                "used": psutil.virtual_memory().used,
-                "percent": psutil.virtual_memory().percent
+                "total": mem.total,
+                "available": mem.available,
+                "used": mem.used,
+                "percent": mem.percent
             },
             "disk": {
-                "partitions": self._get_disk_partitions(),
-                "io_counters": psutil.disk_io_counters()._asdict() if psutil.disk_io_counters() else None
+                "partitions": data["disk_partitions"],
+                "io_counters": disk_io._asdict() if disk_io else None
             },
             "network": {
-                "interfaces": self._get_network_interfaces(),
-                "connections": len(psutil.net_connections())
+                "interfaces": data["interfaces"],
+                "connections": data["connections"]
             }
         }
     
-    async def get_services_status(self) -> Dict[str, Any]:
-        """Get status of system services"""
-        services = [
-            settings.WEB_SERVER,  # nginx or apache
-            "mysql",  # or mariadb
-            "php-fpm",
-            "docker",
-            "redis"
+    async def _collect_services(self) -> Dict[str, Any]:
+        """Collect status of system services"""
+        known_units = await self._get_known_units()
+        installed = [
+            service for service in MONITORED_SERVICES
+            if known_units is None or f"{service}.service" in known_units
         ]
         
-        status = {}
-        for service in services:
-            status[service] = await self._check_service_status(service)
+        status = await self._check_services_status(installed) if installed else {}
+        return {
+            service: status.get(service, {"status": "not-installed", "active": False})
+            for service in MONITORED_SERVICES
+        }
+    
+    async def _get_known_units(self) -> Optional[Set[str]]:
+        """List installed service unit files, or None if systemd can't be asked"""
+        if self._known_units_read_at and time.monotonic() - self._known_units_read_at < UNIT_FILES_TTL:
+            return self._known_units
         
-        return status
+        try:
+            result = await run_command(
+                "systemctl", "list-unit-files", "--type=service", "--no-legend",
+                capture=True, check=True, timeout=10
+            )
+            # Lines look like "nginx.service enabled enabled"
+            self._known_units = {line.split()[0] for line in result.stdout.splitlines() if line.strip()}
+        except Exception:
+            # Don't filter; the status query reports what it can
+            self._known_units = None
+        
+        self._known_units_read_at = time.monotonic()
+        return self._known_units
     
     async def restart_service(self, service_name: str) -> Dict[str, Any]:
         """Restart a system service"""
         try:
-            result = subprocess.run(
-                ["systemctl", "restart", service_name],
-                capture_output=True,
-                text=True,
-                timeout=30
+            result = await run_command(
+                "systemctl", "restart", service_name, capture=True, timeout=30
             )
             
+            # Drop the cached service states so the next read reflects the restart
+            self._cache.pop("services", None)
+            
             if result.returncode == 0:
                 return {"success": True, "message": f"Service {service_name} restarted successfully"}
             else:
@@ -128,49 +320,59 @@ class SystemMonitor:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def get_logs(self, service: str = None, lines: int = 100) -> Dict[str, Any]:
-        """Get system logs"""
-        try:
-            if service:
-                log_file = f"/var/log/{service}/error.log"
-                if not os.path.exists(log_file):
-                    log_file = f"/var/log/{service}.log"
-            else:
-                log_file = "/var/log/syslog"
-            
-            if not os.path.exists(log_file):
-                return {"error": f"Log file not found: {log_file}"}
-            
-            result = subprocess.run(
-                ["tail", "-n", str(lines), log_file],
-                capture_output=True,
-                text=True
-            )
-            
-            return {
-                "service": service or "system",
-                "log_file": log_file,
-                "lines": lines,
-                "content": result.stdout
-            }
+    def open_log_file(self, service: str = None) -> Optional[BinaryIO]:
+        """Open the log file of a service, or return None if there is none"""
+        if service:
+            candidates = (f"/var/log/{service}/error.log", f"/var/log/{service}.log")
+        else:
+            candidates = ("/var/log/syslog",)
         
-        except Exception as e:
-            return {"error": str(e)}
+        # Opening is the existence check; a separate stat could race a rotation
+        for log_file in candidates:
+            try:
+                return open(log_file, "rb")
+            except (FileNotFoundError, IsADirectoryError):
+                continue
+        return None
+    
+    async def stream_logs(self, log: BinaryIO, lines: int = 100) -> AsyncIterator[bytes]:
+        """Yield the last lines of an open log file, closing it afterwards"""
+        try:
+            yield await asyncio.to_thread(_tail, log, lines)
+        except OSError:
+            # The response has already started; end it empty as tail did
+            return
+        finally:
+            log.close()
     
     async def create_system_backup(self) -> Dict[str, Any]:
         """Create a full system backup"""
         try:
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+            timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
             backup_filename = f"system_backup_{timestamp}.tar.gz"
             backup_path = os.path.join(settings.BACKUP_PATH, backup_filename)
             
-            # Create backup of important directories
-            subprocess.run([
-                "tar", "-czf", backup_path,
-                "--exclude=/proc", "--exclude=/sys", "--exclude=/tmp",
-                "--exclude=/var/tmp", "--exclude=/var/cache",
-                "/etc", "/var/www", "/var/log", "/home"
-            ], check=True)
+            # pigz compresses on every core where plain gzip uses one;
+            # tar runs it as its compressor and pipes the archive through it
+            compress = ["-I", "pigz"] if shutil.which("pigz") else ["-z"]
+            
+            # Create backup of important directories; a hung mount can stall
+            # tar indefinitely, so bound it and take pigz down with it
+            try:
+                await run_command(
+                    "tar", *compress, "-cf", backup_path,
+                    "--exclude=/proc", "--exclude=/sys", "--exclude=/tmp",
+                    "--exclude=/var/tmp", "--exclude=/var/cache",
+                    "/etc", "/var/www", "/var/log", "/home",
+                    check=True, timeout=settings.BACKUP_TIMEOUT, new_session=True
+                )
+            except subprocess.TimeoutExpired:
+                # Don't leave a truncated archive that looks like a backup
+                try:
+                    os.remove(backup_path)
+                except FileNotFoundError:
+                    pass
+                return {"success": False, "error": "System backup timed out"}
             
             return {
                 "success": True,
@@ -183,39 +385,51 @@ class SystemMonitor:
     
     async def check_updates(self) -> Dict[str, Any]:
         """Check for system updates"""
+        # Dashboards poll this; answer from the last check while it is fresh
+        if self._updates is not None and time.monotonic() - self._updates_checked_at < UPDATES_TTL:
+            return self._updates
+        
         try:
-            # Update package list
-            subprocess.run(["apt-get", "update"], check=True)
-            
-            # Check for available updates
-            result = subprocess.run([
-                "apt-get", "-s", "upgrade"
-            ], capture_output=True, text=True, check=True)
-            
-            # Parse output to count updates
-            lines = result.stdout.split('\n')
-            upgrade_count = 0
-            for line in lines:
-                if line.startswith('The following packages will be upgraded:'):
-                    # Count the number of packages
-                    upgrade_count = len([l for l in lines if l.strip().startswith(' ') and l.strip().endswith(')')])
-                    break
+            # Update package list unless it was refreshed within the TTL
+            await apt_update(max_age=UPDATES_TTL)
             
-            return {
-                "updates_available": upgrade_count > 0,
-                "upgrade_count": upgrade_count,
-                "last_check": datetime.utcnow().isoformat()
-            }
-        
+            upgrade_count, security_count = await self._count_upgrades()
         except Exception as e:
             return {"error": str(e)}
+        
+        self._updates = {
+            "updates_available": upgrade_count > 0,
+            "upgrade_count": upgrade_count,
+            "security_count": security_count,
+            "last_check": datetime.utcnow().isoformat()
+        }
+        self._updates_checked_at = time.monotonic()
+        return self._updates
+    
+    async def _count_upgrades(self) -> Tuple[int, Optional[int]]:
+        """Count pending upgrades, and security upgrades where apt-check can tell"""
+        # apt-check reads the package cache without running the dependency
+        # solver that an upgrade simulation does
+        try:
+            result = await run_command(APT_CHECK, capture=True, timeout=60)
+            if result.returncode == 0:
+                updates, security = result.stderr.strip().rsplit("\n", 1)[-1].split(";")
+                return int(updates), int(security)
+        except (FileNotFoundError, PermissionError, ValueError):
+            pass
+        
+        # Not Ubuntu, or update-notifier isn't installed
+        result = await run_apt("-s", "upgrade", capture=True, check=True)
+        match = _UPGRADED_RE.search(result.stdout)
+        return (int(match.group(1)) if match else 0), None
     
     async def install_updates(self) -> Dict[str, Any]:
         """Install system updates"""
         try:
-            result = subprocess.run([
-                "apt-get", "upgrade", "-y"
-            ], capture_output=True, text=True, timeout=1800)  # 30 minutes timeout
+            result = await run_apt("upgrade", "-y", capture=True, timeout=1800)  # 30 minutes timeout
+            
+            # The cached update count is stale now
+            self._updates = None
             
             if result.returncode == 0:
                 return {"success": True, "message": "Updates installed successfully"}
@@ -229,126 +443,121 @@ class SystemMonitor:
     
     async def _collect_system_data(self) -> Dict[str, Any]:
         """Collect system monitoring data"""
-        return {
-            "timestamp": datetime.utcnow().isoformat(),
-            "cpu_usage": psutil.cpu_percent(),
-            "memory_usage": psutil.virtual_memory().percent,
-            "disk_usage": psutil.disk_usage('/').percent,
-            "load_average": psutil.getloadavg()
-        }
-    
-    def _get_uptime(self) -> float:
-        """Get system uptime in seconds"""
-        return time.time() - psutil.boot_time()
+        # psutil reads /proc synchronously, so keep it off the event loop
+        data, partitions = await asyncio.gather(
+            asyncio.to_thread(self._read_system_data),
+            self._get_disk_partitions()
+        )
+        data["disk_partitions"] = partitions
+        return data
     
-    def _get_load_average(self) -> List[float]:
-        """Get system load average"""
-        return list(psutil.getloadavg())
-    
-    def _get_memory_usage(self) -> Dict[str, Any]:
-        """Get memory usage information"""
+    def _read_system_data(self) -> Dict[str, Any]:
+        """Read every metric the status endpoints report, each source once"""
         mem = psutil.virtual_memory()
-        return {
-            "total": mem.total,
-            "used": mem.used,
-            "available": mem.available,
-            "percent": mem.percent
-        }
-    
-    def _get_disk_usage(self) -> Dict[str, Any]:
-        """Get disk usage information"""
         disk = psutil.disk_usage('/')
+        
         return {
-            "total": disk.total,
-            "used": disk.used,
-            "free": disk.free,
-            "percent": disk.percent
+            "timestamp": datetime.utcnow().isoformat(),
+            # psutil reports the usage since its previous call, so sampling
+            # here every tick means requests never sleep to measure an interval
+            "cpu_usage": psutil.cpu_percent(interval=None),
+            "memory_usage": mem.percent,
+            "disk_usage": disk.percent,
+            "load_average": list(psutil.getloadavg()),
+            "uptime": self._get_uptime(),
+            "memory": mem,
+            "root_disk": disk,
+            "cpu_freq": psutil.cpu_freq(),
+            "disk_io": psutil.disk_io_counters(),
+            "net_io": psutil.net_io_counters(),
+            "interfaces": self._get_network_interfaces(),
+            "connections": _connection_count()
         }
     
-    def _get_cpu_usage(self) -> float:
-        """Get CPU usage percentage"""
-        return psutil.cpu_percent(interval=1)
-    
-    def _get_network_status(self) -> Dict[str, Any]:
-        """Get network status"""
-        net_io = psutil.net_io_counters()
-        return {
-            "bytes_sent": net_io.bytes_sent,
-            "bytes_recv": net_io.bytes_recv,
-            "packets_sent": net_io.packets_sent,
-            "packets_recv": net_io.packets_recv
-        }
+    def _get_uptime(self) -> float:
+        """Get system uptime in seconds"""
+        # /proc/uptime is two numbers; boot_time() would parse all of /proc/stat
+        with open("/proc/uptime", "rb") as f:
+            return float(f.read().split()[0])
     
-    def _get_disk_partitions(self) -> List[Dict[str, Any]]:
+    async def _get_disk_partitions(self) -> List[Dict[str, Any]]:
         """Get disk partition information"""
-        partitions = []
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                partitions.append({
-                    "device": partition.device,
-                    "mountpoint": partition.mountpoint,
-                    "fstype": partition.fstype,
-                    "total": usage.total,
-                    "used": usage.used,
-                    "free": usage.free,
-                    "percent": usage.percent
-                })
-            except PermissionError:
-                continue
-        return partitions
+        partitions = [
+            partition for partition in await asyncio.to_thread(psutil.disk_partitions)
+            if partition.fstype not in _PSEUDO_FSTYPES
+        ]
+        
+        # Query every mount at once so the slowest one, capped by the timeout,
+        # bounds the wait instead of the sum of them. A timed-out statvfs keeps
+        # its worker thread until the mount answers.
+        usages = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    asyncio.to_thread(psutil.disk_usage, partition.mountpoint),
+                    DISK_USAGE_TIMEOUT
+                )
+                for partition in partitions
+            ),
+            return_exceptions=True
+        )
+        
+        return [
+            {
+                "device": partition.device,
+                "mountpoint": partition.mountpoint,
+                "fstype": partition.fstype,
+                "total": usage.total,
+                "used": usage.used,
+                "free": usage.free,
+                "percent": usage.percent
+            }
+            for partition, usage in zip(partitions, usages)
+            # Skip mounts that timed out or refused the query
+            if not isinstance(usage, BaseException)
+        ]
     
     def _get_network_interfaces(self) -> Dict[str, Any]:
         """Get network interface information"""
-        interfaces = {}
-        for interface, addresses in psutil.net_if_addrs().items():
-            interfaces[interface] = {
-                "addresses": [addr.address for addr in addresses if addr.family == psutil.AF_INET],
-                "mac": next((addr.address for addr in addresses if addr.family == psutil.AF_LINK), None)
-            }
-        return interfaces
+        return _network_interfaces()
     
-    async def _check_service_status(self, service_name: str) -> Dict[str, Any]:
-        """Check status of a system service"""
+    async def _check_services_status(self, service_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Check status of several system services with a single systemctl call"""
         try:
-            result = subprocess.run([
-                "systemctl", "is-active", service_name
-            ], capture_output=True, text=True, timeout=10)
-            
-            is_active = result.returncode == 0
-            status = "active" if is_active else "inactive"
-            
-            # Get additional service info
-            try:
-                info_result = subprocess.run([
-                    "systemctl", "show", service_name, "--property=LoadState,ActiveState,SubState"
-                ], capture_output=True, text=True, timeout=10)
-                
-                service_info = {}
-                for line in info_result.stdout.split('\n'):
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        service_info[key] = value
-                
-                return {
-                    "status": status,
-                    "active": is_active,
-                    "load_state": service_info.get("LoadState", "unknown"),
-                    "active_state": service_info.get("ActiveState", "unknown"),
-                    "sub_state": service_info.get("SubState", "unknown")
-                }
-            
-            except Exception:
-                return {
-                    "status": status,
-                    "active": is_active
-                }
-        
+            result = await run_command(
+                "systemctl", "show", *service_names,
+                "--property=LoadState,ActiveState,SubState,UnitFileState",
+                capture=True, timeout=10
+            )
         except subprocess.TimeoutExpired:
-            return {"status": "timeout", "active": False}
+            return {name: {"status": "timeout", "active": False} for name in service_names}
         except Exception:
-            return {"status": "error", "active": False}
+            return {name: {"status": "error", "active": False} for name in service_names}
+        
+        # systemctl prints one blank-line separated block per unit, in argument
+        # order; unknown units still get a block with LoadState=not-found
+        blocks = result.stdout.strip().split('\n\n')
+        if len(blocks) != len(service_names):
+            return {name: {"status": "error", "active": False} for name in service_names}
+        
+        status = {}
+        for name, block in zip(service_names, blocks):
+            service_info = dict(line.split('=', 1) for line in block.split('\n') if '=' in line)
+            is_active = service_info.get("ActiveState") == "active"
+            
+            status[name] = {
+                "status": "active" if is_active else "inactive",
+                "active": is_active,
+                "load_state": service_info.get("LoadState", "unknown"),
+                "active_state": service_info.get("ActiveState", "unknown"),
+                "sub_state": service_info.get("SubState", "unknown"),
+                "unit_file_state": service_info.get("UnitFileState", "unknown")
+            }
+        
+        return status
 
 
-# Import time module for uptime calculation
-import time 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_system_monitor() -> SystemMonitor:
+    """Get the shared system monitor instance"""
+    return SystemMonitor()
+ 
\ No newline at end of file
@@ -2,11 +2,38 @@
 Web server service for managing Nginx and Apache configurations
 """
 
+import asyncio
 import os
-import subprocess
+import signal
+from functools import lru_cache
 from typing import Optional
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
 from app.core.config import settings
 from app.core.database import Website
+from app.core.process import run_command
+
+
+# Config templates are parsed once at import; nothing edits them at runtime
+_templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")),
+    auto_reload=False,
+    undefined=StrictUndefined
+)
+_NGINX_VHOST = _templates.get_template("nginx_vhost.conf.j2")
+_APACHE_VHOST = _templates.get_template("apache_vhost.conf.j2")
+_NGINX_SSL = _templates.get_template("nginx_ssl.conf.j2")
+_APACHE_SSL = _templates.get_template("apache_ssl.conf.j2")
+
+# Master pid file, graceful-reload signal and systemd unit of each web server
+_RELOAD = {
+    "nginx": ("/run/nginx.pid", signal.SIGHUP, "nginx"),
+    "apache": ("/run/apache2/apache2.pid", signal.SIGUSR1, "apache2")
+}
+
+# Seconds reload requests are collected before the web server is reloaded
+RELOAD_DEBOUNCE = 0.5
+
+_pending_reload: Optional[asyncio.Task] = None
 
 
 class WebServerService:
@@ -37,19 +64,59 @@ class WebServerService:
         config_file = f"{self.conf_dir}/{domain_name}.conf"
         enabled_file = f"{self.enabled_dir}/{domain_name}.conf"
         
-        # Remove configuration files
-        if os.path.exists(config_file):
-            os.remove(config_file)
-        
-        if os.path.exists(enabled_file):
-            os.remove(enabled_file)
+        await asyncio.to_thread(self._remove_configs, enabled_file, config_file)
+    
+    @staticmethod
+    def _remove_configs(*paths: str):
+        """Remove configuration files; unlink reports a missing file itself"""
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
     
     async def reload(self):
-        """Reload web server configuration"""
-        if self.web_server == "nginx":
-            subprocess.run(["systemctl", "reload", "nginx"])
-        elif self.web_server == "apache":
-            subprocess.run(["systemctl", "reload", "apache2"])
+        """Reload web server configuration
+        
+        Requests arriving within RELOAD_DEBOUNCE of each other share one reload,
+        so a burst of vhost changes parses the configuration once.
+        """
+        # A caller giving up must not cancel the reload others are waiting on
+        await asyncio.shield(self.schedule_reload())
+    
+    def schedule_reload(self) -> asyncio.Task:
+        """Queue a debounced reload without waiting for it to happen"""
+        global _pending_reload
+        
+        if _pending_reload is None:
+            _pending_reload = asyncio.create_task(self._debounced_reload())
+            # Nobody may await it; fetch the outcome so a failure isn't
+            # reported as a never-retrieved task exception
+            _pending_reload.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return _pending_reload
+    
+    async def _debounced_reload(self):
+        """Wait out the debounce window, then reload"""
+        global _pending_reload
+        
+        await asyncio.sleep(RELOAD_DEBOUNCE)
+        # Changes written from here on need a reload of their own
+        _pending_reload = None
+        await self._reload_now()
+    
+    async def _reload_now(self):
+        """Signal the web server to reload its configuration"""
+        if self.web_server not in _RELOAD:
+            return
+        pid_file, sig, unit = _RELOAD[self.web_server]
+        
+        # Signalling the master is all systemctl reload ends up doing
+        try:
+            with open(pid_file) as f:
+                os.kill(int(f.read()), sig)
+        except (OSError, ValueError):
+            # Not running, stale pid file, or not ours to signal
+            await run_command("systemctl", "reload", unit)
     
     async def _create_nginx_vhost(self, website: Website):
         """Create Nginx virtual host configuration"""
@@ -57,57 +124,13 @@ class WebServerService:
         config_file = f"{self.conf_dir}/{domain_name}.conf"
         
         # Create Nginx configuration
-        config_content = f"""server {{
-    listen 80;
-    server_name {website.domain} www.{website.domain};
-    root {website.document_root};
-    index index.php index.html index.htm;
-
-    # Logs
-    access_log /var/log/nginx/{domain_name}.access.log;
-    error_log /var/log/nginx/{domain_name}.error.log;
-
-    # Security headers
-    add_header X-Frame-Options "SAMEORIGIN" always;
-    add_header X-XSS-Protection "1; mode=block" always;
-    add_header X-Content-Type-Options "nosniff" always;
-    add_header Referrer-Policy "no-referrer-when-downgrade" always;
-    add_header Content-Security-Policy "default-src 'self' http: https: data: blob: 'unsafe-inline'" always;
-
-    # Handle PHP files
-    location ~ \.php$ {{
-        try_files $uri =404;
-        fastcgi_split_path_info ^(.+\.php)(/.+)$;
-        fastcgi_pass unix:/var/run/php/php{website.php_version or '8.1'}-fpm.sock;
-        fastcgi_index index.php;
-        include fastcgi_params;
-        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
-        fastcgi_param PATH_INFO $fastcgi_path_info;
-    }}
-
-    # Handle static files
-    location ~* \.(jpg|jpeg|png|gif|ico|css|js|pdf|txt)$ {{
-        expires 1y;
-        add_header Cache-Control "public, immutable";
-    }}
-
-    # Main location block
-    location / {{
-        try_files $uri $uri/ /index.php?$args;
-    }}
-
-    # Deny access to hidden files
-    location ~ /\. {{
-        deny all;
-    }}
-}}"""
+        config_content = _NGINX_VHOST.render(website=website, domain_name=domain_name)
         
         # Write configuration file
-        with open(config_file, "w") as f:
-            f.write(config_content)
+        await asyncio.to_thread(self._write_config, config_file, config_content)
         
         # Enable site
-        subprocess.run(["ln", "-sf", config_file, f"{self.enabled_dir}/{domain_name}.conf"])
+        await asyncio.to_thread(self._enable_site, config_file, f"{self.enabled_dir}/{domain_name}.conf")
     
     async def _create_apache_vhost(self, website: Website):
         """Create Apache virtual host configuration"""
@@ -115,27 +138,13 @@ class WebServerService:
         config_file = f"{self.conf_dir}/{domain_name}.conf"
         
         # Create Apache configuration
-        config_content = f"""<VirtualHost *:80>
-    ServerName {website.domain}
-    ServerAlias www.{website.domain}
-    DocumentRoot {website.document_root}
-    
-    <Directory "{website.document_root}">
-        Options FollowSymLinks
-        AllowOverride All
-        Require all granted
-    </Directory>
-    
-    ErrorLog ${{APACHE_LOG_DIR}}/{domain_name}.error.log
-    CustomLog ${{APACHE_LOG_DIR}}/{domain_name}.access.log combined
-</VirtualHost>"""
+        config_content = _APACHE_VHOST.render(website=website, domain_name=domain_name)
         
         # Write configuration file
-        with open(config_file, "w") as f:
-            f.write(config_content)
+        await asyncio.to_thread(self._write_config, config_file, config_content)
         
-        # Enable site
-        subprocess.run(["a2ensite", f"{domain_name}.conf"])
+        # Enable site; a2ensite does no more than create this symlink
+        await asyncio.to_thread(self._enable_site, config_file, f"{self.enabled_dir}/{domain_name}.conf")
     
     async def _update_nginx_vhost(self, website: Website):
         """Update Nginx virtual host configuration"""
@@ -145,119 +154,82 @@ class WebServerService:
         """Update Apache virtual host configuration"""
         await self._create_apache_vhost(website)
     
-    async def install_ssl(self, domain: str, cert_path: str, key_path: str):
-        """Install SSL certificate for a domain"""
+    async def install_ssl(self, domain: str, cert_path: str, key_path: str) -> bool:
+        """Install SSL certificate for a domain, returning whether the config changed"""
         domain_name = domain.split('.')[0]
         
         if self.web_server == "nginx":
-            await self._install_nginx_ssl(domain_name, domain, cert_path, key_path)
+            return await self._install_nginx_ssl(domain_name, domain, cert_path, key_path)
         elif self.web_server == "apache":
-            await self._install_apache_ssl(domain_name, domain, cert_path, key_path)
-    
-    async def _install_nginx_ssl(self, domain_name: str, domain: str, cert_path: str, key_path: str):
+            return await self._install_apache_ssl(domain_name, domain, cert_path, key_path)
+        return False
+    
+    def _enable_site(self, config_file: str, enabled_file: str):
+        """Link a config into the enabled directory, like ln -sf"""
+        try:
+            if os.readlink(enabled_file) == config_file:
+                return
+        except OSError:
+            pass
+        
+        # Replace any existing entry in one rename rather than unlink + symlink
+        tmp_link = f"{enabled_file}.tmp"
+        try:
+            os.unlink(tmp_link)
+        except FileNotFoundError:
+            pass
+        os.symlink(config_file, tmp_link)
+        os.replace(tmp_link, enabled_file)
+    
+    def _write_config(self, config_file: str, content: str) -> bool:
+        """Write a config file unless it already has this content, returning whether it changed"""
+        try:
+            with open(config_file) as f:
+                if f.read() == content:
+                    return False
+        except FileNotFoundError:
+            pass
+        
+        # Write a sibling file and rename it over the config, so a reload
+        # racing with this write sees the old file or the new one, never half
+        tmp_file = f"{config_file}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, content.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, config_file)
+        return True
+    
+    async def _install_nginx_ssl(self, domain_name: str, domain: str, cert_path: str, key_path: str) -> bool:
         """Install SSL certificate for Nginx"""
         config_file = f"{self.conf_dir}/{domain_name}.conf"
         
         # Update configuration with SSL
-        ssl_config = f"""
-# Redirect HTTP to HTTPS
-server {{
-    listen 80;
-    server_name {domain} www.{domain};
-    return 301 https://$server_name$request_uri;
-}}
-
-# HTTPS server
-server {{
-    listen 443 ssl http2;
-    server_name {domain} www.{domain};
-    root {settings.BASE_DIR}/{domain_name};
-    index index.php index.html index.htm;
-
-    # SSL configuration
-    ssl_certificate {cert_path};
-    ssl_certificate_key {key_path};
-    ssl_protocols TLSv1.2 TLSv1.3;
-    ssl_ciphers ECDHE-RSA-AES256-GCM-SHA512:DHE-RSA-AES256-GCM-SHA512:ECDHE-RSA-AES256-GCM-SHA384:DHE-RSA-AES256-GCM-SHA384;
-    ssl_prefer_server_ciphers off;
-    ssl_session_cache shared:SSL:10m;
-    ssl_session_timeout 10m;
-
-    # Security headers
-    add_header Strict-Transport-Security "max-age=31536000; includeSubDomains" always;
-    add_header X-Frame-Options "SAMEORIGIN" always;
-    add_header X-XSS-Protection "1; mode=block" always;
-    add_header X-Content-Type-Options "nosniff" always;
-    add_header Referrer-Policy "no-referrer-when-downgrade" always;
-
-    # Logs
-    access_log /var/log/nginx/{domain_name}.access.log;
-    error_log /var/log/nginx/{domain_name}.error.log;
-
-    # Handle PHP files
-    location ~ \.php$ {{
-        try_files $uri =404;
-        fastcgi_split_path_info ^(.+\.php)(/.+)$;
-        fastcgi_pass unix:/var/run/php/php8.1-fpm.sock;
-        fastcgi_index index.php;
-        include fastcgi_params;
-        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
-        fastcgi_param PATH_INFO $fastcgi_path_info;
-    }}
-
-    # Handle static files
-    location ~* \.(jpg|jpeg|png|gif|ico|css|js|pdf|txt)$ {{
-        expires 1y;
-        add_header Cache-Control "public, immutable";
-    }}
-
-    # Main location block
-    location / {{
-        try_files $uri $uri/ /index.php?$args;
-    }}
-
-    # Deny access to hidden files
-    location ~ /\. {{
-        deny all;
-    }}
-}}"""
+        ssl_config = _NGINX_SSL.render(
+            domain=domain, domain_name=domain_name, base_dir=settings.BASE_DIR,
+            cert_path=cert_path, key_path=key_path
+        )
         
         # Write updated configuration
-        with open(config_file, "w") as f:
-            f.write(ssl_config)
+        return await asyncio.to_thread(self._write_config, config_file, ssl_config)
     
-    async def _install_apache_ssl(self, domain_name: str, domain: str, cert_path: str, key_path: str):
+    async def _install_apache_ssl(self, domain_name: str, domain: str, cert_path: str, key_path: str) -> bool:
         """Install SSL certificate for Apache"""
         config_file = f"{self.conf_dir}/{domain_name}.conf"
         
         # Update configuration with SSL
-        ssl_config = f"""# HTTP to HTTPS redirect
-<VirtualHost *:80>
-    ServerName {domain}
-    ServerAlias www.{domain}
-    Redirect permanent / https://{domain}/
-</VirtualHost>
-
-# HTTPS server
-<VirtualHost *:443>
-    ServerName {domain}
-    ServerAlias www.{domain}
-    DocumentRoot {settings.BASE_DIR}/{domain_name}
-    
-    SSLEngine on
-    SSLCertificateFile {cert_path}
-    SSLCertificateKeyFile {key_path}
-    
-    <Directory "{settings.BASE_DIR}/{domain_name}">
-        Options FollowSymLinks
-        AllowOverride All
-        Require all granted
-    </Directory>
-    
-    ErrorLog ${{APACHE_LOG_DIR}}/{domain_name}.error.log
-    CustomLog ${{APACHE_LOG_DIR}}/{domain_name}.access.log combined
-</VirtualHost>"""
+        ssl_config = _APACHE_SSL.render(
+            domain=domain, domain_name=domain_name, base_dir=settings.BASE_DIR,
+            cert_path=cert_path, key_path=key_path
+        )
         
         # Write updated configuration
-        with open(config_file, "w") as f:
-            f.write(ssl_config) 
\ No newline at end of file
+        return await asyncio.to_thread(self._write_config, config_file, ssl_config) 
+
+
+@lru_cache(maxsize=1)
+def get_web_server_service() -> WebServerService:
+    """Get the shared web server service instance"""
+    return WebServerService()
@@ -3,40 +3,268 @@ Website service for managing website operations
 """
 
 import os
+import pwd
+import gzip
+import stat
+import tarfile
+import time
 import shutil
-import subprocess
 import asyncio
-from typing import Optional
-from sqlalchemy.orm import Session
+import threading
+import requests
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from app.core.config import settings
 from app.core.database import Website, Database, Backup
 from app.schemas.website import WebsiteCreate, WebsiteUpdate, WebsiteStats
-from app.services.web_server_service import WebServerService
-from app.services.database_service import DatabaseService
+from app.services.web_server_service import get_web_server_service
+from app.services.database_service import DatabaseService, delete_returning
+
+
+# Owner and mode applied to website files
+WEB_USER = "www-data"
+WEB_MODE = 0o755
+
+# Rows per INSERT statement when creating websites in bulk
+INSERT_CHUNK = 1000
+# Websites laid out on disk at once during a bulk create
+PROVISION_CONCURRENCY = 8
+
+WORDPRESS_URL = "https://wordpress.org/latest.tar.gz"
+# Seconds a download may wait to connect or for more data before giving up
+DOWNLOAD_TIMEOUT = 60
+
+# Seconds a cached disk usage figure may be served without a re-walk; edits
+# deeper in the tree don't touch the root's mtime, so this bounds staleness
+DISK_USAGE_MAX_AGE = 300
+
+# Disk usage keyed by website id: (root mtime_ns, measured at, total bytes)
+_DU_CACHE: Dict[int, Tuple[int, float, int]] = {}
+# Caps cold disk usage walks running at once across all requests
+DISK_USAGE_CONCURRENCY = 4
+_du_walks = asyncio.Semaphore(DISK_USAGE_CONCURRENCY)
+
+# Built once; SQLAlchemy's compiled cache then serves every call
+LAST_BACKUP_AT = (
+    select(Backup.created_at)
+    .where(Backup.website_id == bindparam("website_id"))
+    .order_by(Backup.created_at.desc())
+    .limit(1)
+)
+
+# Starter files written by _setup_*; $domain is the site's domain. Templates
+# use $-placeholders so the braces in CSS and Jinja need no escaping
+_PHP_INDEX = b"""<!DOCTYPE html>
+<html>
+<head>
+    <title><?php echo htmlspecialchars($_SERVER['HTTP_HOST']); ?></title>
+</head>
+<body>
+    <h1>Welcome to <?php echo htmlspecialchars($_SERVER['HTTP_HOST']); ?></h1>
+    <p>PHP version: <?php echo phpversion(); ?></p>
+    <p>Server time: <?php echo date('Y-m-d H:i:s'); ?></p>
+</body>
+</html>"""
+
+_STATIC_INDEX = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <title>Welcome to $domain</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        .container { max-width: 800px; margin: 0 auto; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Welcome to $domain</h1>
+        <p>Your static website is ready!</p>
+        <p>Upload your files to this directory to get started.</p>
+    </div>
+</body>
+</html>""")
+
+_PYTHON_REQUIREMENTS = b"""Flask==2.3.3
+gunicorn==21.2.0"""
+
+_PYTHON_APP = Template("""from flask import Flask, render_template_string
+
+app = Flask(__name__)
+
+@app.route('/')
+def index():
+    return render_template_string('''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Welcome to {{ domain }}</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 40px; }
+                .container { max-width: 800px; margin: 0 auto; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <h1>Welcome to {{ domain }}</h1>
+                <p>Your Python Flask application is ready!</p>
+                <p>Edit app.py to customize your application.</p>
+            </div>
+        </body>
+        </html>
+    ''', domain='$domain')
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)""")
+
+_DOCKER_COMPOSE = b"""version: '3.8'
+
+services:
+  web:
+    image: nginx:alpine
+    ports:
+      - "8080:80"
+    volumes:
+      - ./html:/usr/share/nginx/html
+    restart: unless-stopped"""
+
+_DOCKER_INDEX = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <title>Welcome to $domain</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        .container { max-width: 800px; margin: 0 auto; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Welcome to $domain</h1>
+        <p>Your Docker container is ready!</p>
+        <p>Edit the docker-compose.yml file to customize your setup.</p>
+    </div>
+</body>
+</html>""")
+
+
+@lru_cache(maxsize=None)
+def _uid_gid(username: str) -> Tuple[int, int]:
+    """Look up a system user's uid and gid; NSS may be backed by LDAP, so remember them"""
+    user = pwd.getpwnam(username)
+    return user.pw_uid, user.pw_gid
+
+
+def _download_and_extract(url: str, root: str):
+    """Stream a .tar.gz into a directory, dropping its top-level folder like --strip-components=1"""
+    with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        # "r|gz" reads the archive strictly forwards, straight off the socket
+        with tarfile.open(fileobj=response.raw, mode="r|gz") as tar:
+            for member in tar:
+                _, _, member.name = member.name.partition("/")
+                if not member.name:
+                    continue
+                if member.islnk():
+                    _, _, member.linkname = member.linkname.partition("/")
+                # The data filter rejects absolute paths, .. and device files
+                if hasattr(tarfile, "data_filter"):
+                    tar.extract(member, root, filter="data")
+                else:
+                    tar.extract(member, root)
+
+
+def _document_root(website_data: WebsiteCreate) -> str:
+    """Document root for a new website, defaulting to BASE_DIR/<first domain label>"""
+    domain_name = website_data.domain.split('.')[0]
+    return website_data.document_root or f"{settings.BASE_DIR}/{domain_name}"
+
+
+async def _write_file(path: str, content: bytes):
+    """Write a file from a worker thread"""
+    await asyncio.to_thread(Path(path).write_bytes, content)
+
+
+def _tree_size(path: str) -> int:
+    """Total size of the regular files under a directory, like du --apparent-size"""
+    total = 0
+    # fwalk holds a descriptor per directory, so each file is an fstatat on
+    # its bare name instead of resolving the full path again
+    try:
+        for _, _, filenames, dir_fd in os.fwalk(path):
+            for name in filenames:
+                try:
+                    st = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+                except OSError:
+                    continue
+                # filenames also lists symlinks and other non-directories
+                if stat.S_ISREG(st.st_mode):
+                    total += st.st_size
+    except OSError:
+        # The root itself vanished or can't be opened
+        pass
+    return total
+
+
+def _write_archive(archive_path: str, root: str, cancel: threading.Event) -> int:
+    """Archive a directory as a gzipped tar, like tar -czf with the root's name as its top entry
+
+    Returns the archive's size. Setting cancel stops it at the next member;
+    a failed or cancelled run removes its partial archive.
+    """
+    def check_cancel(member: tarfile.TarInfo) -> tarfile.TarInfo:
+        if cancel.is_set():
+            raise TimeoutError("Backup cancelled")
+        return member
+    
+    try:
+        # mtime=0 keeps the gzip header stable, so unchanged sites give identical archives
+        with gzip.GzipFile(archive_path, "wb", compresslevel=6, mtime=0) as gz:
+            with tarfile.open(fileobj=gz, mode="w|") as tar:
+                tar.add(root, arcname=os.path.basename(root), filter=check_cancel)
+        return os.path.getsize(archive_path)
+    except BaseException:
+        # Don't leave a truncated archive that looks like a backup
+        try:
+            os.remove(archive_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _set_web_permissions(root: str):
+    """Hand a document root to the web server user, like chown -R plus chmod -R 755"""
+    uid, gid = _uid_gid(WEB_USER)
+    
+    os.chown(root, uid, gid)
+    os.chmod(root, WEB_MODE)
+    
+    # fwalk yields a descriptor per directory, so each entry is changed
+    # relative to it instead of re-resolving the full path
+    for dirpath, dirnames, filenames, dir_fd in os.fwalk(root):
+        for name in dirnames + filenames:
+            os.chown(name, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+            # chmod -R leaves symlinks alone; Linux can't chmod them anyway
+            if not stat.S_ISLNK(os.stat(name, dir_fd=dir_fd, follow_symlinks=False).st_mode):
+                os.chmod(name, WEB_MODE, dir_fd=dir_fd)
 
 
 class WebsiteService:
     """Service for managing websites"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.web_server_service = WebServerService()
+        self.web_server_service = get_web_server_service()
         self.database_service = DatabaseService(db)
     
     async def create_website(self, website_data: WebsiteCreate, owner_id: int) -> Website:
         """Create a new website"""
-        # Extract domain name for directory
-        domain_name = website_data.domain.split('.')[0]
-        document_root = website_data.document_root or f"{settings.BASE_DIR}/{domain_name}"
-        
-        # Create website directory
-        os.makedirs(document_root, exist_ok=True)
-        
-        # Set proper permissions
-        subprocess.run(["chown", "-R", "www-data:www-data", document_root])
-        subprocess.run(["chmod", "-R", "755", document_root])
+        document_root = _document_root(website_data)
         
         # Create website record
         website = Website(
@@ -50,23 +278,77 @@ class WebsiteService:
         )
         
         self.db.add(website)
-        self.db.commit()
-        self.db.refresh(website)
+        await self.db.commit()
+        await self.db.refresh(website)
         
-        # Setup website based on type
-        await self._setup_website_by_type(website, website_data.type)
+        await self._provision(website)
         
-        # Create virtual host configuration
-        await self.web_server_service.create_virtual_host(website)
+        # Record the starter tree's size so stats don't have to walk it
+        await self._store_disk_usage(website, await self._disk_usage(website))
         
-        # Reload web server
-        await self.web_server_service.reload()
+        # Reload web server; batched with other changes, so don't wait on it
+        self.web_server_service.schedule_reload()
         
         return website
     
+    async def create_websites(self, items: List[WebsiteCreate], owner_id: int) -> List[Website]:
+        """Create several websites with chunked bulk INSERTs and a single commit"""
+        rows = [
+            {
+                "domain": item.domain,
+                "name": item.name,
+                "type": item.type,
+                "document_root": _document_root(item),
+                "php_version": item.php_version,
+                "ssl_enabled": item.ssl_enabled,
+                "owner_id": owner_id
+            }
+            for item in items
+        ]
+        
+        for start in range(0, len(rows), INSERT_CHUNK):
+            await self.db.execute(insert(Website), rows[start:start + INSERT_CHUNK])
+        await self.db.commit()
+        
+        # Load the batch back, with ids and defaults, in one query
+        result = await self.db.scalars(
+            select(Website)
+            .where(Website.domain.in_([row["domain"] for row in rows]))
+            .order_by(Website.id)
+        )
+        websites = result.all()
+        
+        # Lay the sites out on disk side by side; the database is not touched
+        semaphore = asyncio.Semaphore(PROVISION_CONCURRENCY)
+        
+        async def provision(website: Website):
+            async with semaphore:
+                await self._provision(website)
+        
+        await asyncio.gather(*(provision(website) for website in websites))
+        
+        # One reload covers the whole batch
+        self.web_server_service.schedule_reload()
+        
+        return websites
+    
+    async def _provision(self, website: Website):
+        """Create a website's directory, starter files and virtual host"""
+        await asyncio.to_thread(os.makedirs, website.document_root, exist_ok=True)
+        
+        # Setup website based on type
+        await self._setup_website_by_type(website, website.type)
+        
+        # Set proper permissions once the starter files are in place, in a
+        # single pass over the finished tree
+        await asyncio.to_thread(_set_web_permissions, website.document_root)
+        
+        # Create virtual host configuration
+        await self.web_server_service.create_virtual_host(website)
+    
     async def update_website(self, website_id: int, website_data: WebsiteUpdate) -> Website:
         """Update a website"""
-        website = self.db.query(Website).filter(Website.id == website_id).first()
+        website = await self.db.get(Website, website_id)
         if not website:
             raise ValueError("Website not found")
         
@@ -85,18 +367,18 @@ class WebsiteService:
         
         website.updated_at = datetime.utcnow()
         
-        self.db.commit()
-        self.db.refresh(website)
+        await self.db.commit()
+        await self.db.refresh(website)
         
         # Update virtual host configuration
         await self.web_server_service.update_virtual_host(website)
-        await self.web_server_service.reload()
+        self.web_server_service.schedule_reload()
         
         return website
     
     async def delete_website(self, website_id: int):
         """Delete a website"""
-        website = self.db.query(Website).filter(Website.id == website_id).first()
+        website = await self.db.get(Website, website_id)
         if not website:
             raise ValueError("Website not found")
         
@@ -104,70 +386,152 @@ class WebsiteService:
         await self.web_server_service.delete_virtual_host(website)
         
         # Delete website directory
-        if os.path.exists(website.document_root):
-            shutil.rmtree(website.document_root)
-        
-        # Delete associated databases
-        databases = self.db.query(Database).filter(Database.website_id == website_id).all()
-        for database in databases:
-            await self.database_service.delete_database(database.id)
+        try:
+            await asyncio.to_thread(shutil.rmtree, website.document_root)
+        except FileNotFoundError:
+            pass
+        # Ids can be reused once the row is gone
+        _DU_CACHE.pop(website_id, None)
+        
+        # Delete associated database records in one statement, then drop the
+        # server-side databases concurrently on pooled connections. Only plain
+        # columns come back and no Database objects are loaded in the session,
+        # so skip matching the deleted rows against the identity map
+        databases = await delete_returning(
+            self.db,
+            delete(Database)
+            .where(Database.website_id == website_id)
+            .execution_options(synchronize_session=False),
+            Database.name, Database.username
+        )
+        try:
+            await asyncio.gather(*(
+                self.database_service.drop_server_database(database.name, database.username)
+                for database in databases
+            ))
+        except Exception:
+            # Keep the records if a server-side drop failed
+            await self.db.rollback()
+            raise
+        
+        # Keep the backups but unlink them; SQLite doesn't enforce ON DELETE
+        # SET NULL and reuses the freed id, which would hand them to a new site
+        await self.db.execute(
+            update(Backup)
+            .where(Backup.website_id == website_id)
+            .values(website_id=None)
+            .execution_options(synchronize_session=False)
+        )
         
-        # Delete website record
-        self.db.delete(website)
-        self.db.commit()
+        # Delete website record, committing everything at once
+        await self.db.delete(website)
+        await self.db.commit()
         
         # Reload web server
-        await self.web_server_service.reload()
+        self.web_server_service.schedule_reload()
     
     async def get_website_stats(self, website_id: int) -> WebsiteStats:
         """Get website statistics"""
-        website = self.db.query(Website).filter(Website.id == website_id).first()
+        website = await self.db.get(Website, website_id)
         if not website:
             raise ValueError("Website not found")
         
-        # Calculate disk usage
-        disk_usage = 0
-        if os.path.exists(website.document_root):
-            for dirpath, dirnames, filenames in os.walk(website.document_root):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    try:
-                        disk_usage += os.path.getsize(filepath)
-                    except OSError:
-                        pass
-        
-        # Get last backup
-        last_backup = self.db.query(Backup).filter(
-            Backup.name.like(f"%{website.domain}%")
-        ).order_by(Backup.created_at.desc()).first()
+        # _disk_usage re-walks once the root's mtime moves or the figure ages
+        # out; keep the stored column in step with what it measures
+        disk_usage = await self._disk_usage(website)
+        if website.disk_usage_dirty or disk_usage != website.disk_usage:
+            await self._store_disk_usage(website, disk_usage)
+        
+        # Get last backup time straight from the (website_id, created_at) index
+        last_backup_at = await self.db.scalar(LAST_BACKUP_AT, {"website_id": website.id})
         
         return WebsiteStats(
-            disk_usage=disk_usage,
+            disk_usage=website.disk_usage,
             bandwidth_usage=0,  # TODO: Implement bandwidth tracking
             requests_per_day=0,  # TODO: Implement request tracking
             uptime_percentage=100.0,  # TODO: Implement uptime monitoring
-            last_backup=last_backup.created_at if last_backup else None
+            last_backup=last_backup_at
         )
     
+    async def refresh_disk_usage(self, website_id: int) -> int:
+        """Re-measure a website's disk usage from scratch and store it"""
+        website = await self.db.get(Website, website_id)
+        if not website:
+            raise ValueError("Website not found")
+        
+        _DU_CACHE.pop(website.id, None)
+        await self._store_disk_usage(website, await self._disk_usage(website))
+        return website.disk_usage
+    
+    async def _store_disk_usage(self, website: Website, total: int):
+        """Save a measured disk usage figure and clear the dirty flag"""
+        # A measurement isn't an edit: pin updated_at so its onupdate doesn't
+        # fire, which would also expire it on the instance being returned
+        await self.db.execute(
+            update(Website)
+            .where(Website.id == website.id)
+            .values(disk_usage=total, disk_usage_dirty=False, updated_at=Website.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        set_committed_value(website, "disk_usage", total)
+        set_committed_value(website, "disk_usage_dirty", False)
+    
+    async def _disk_usage(self, website: Website) -> int:
+        """Disk usage of a website, re-walked only when its root has changed"""
+        try:
+            mtime_ns = os.stat(website.document_root).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        
+        cached = self._cached_disk_usage(website.id, mtime_ns)
+        if cached is not None:
+            return cached
+        
+        async with _du_walks:
+            # Another request may have walked this tree while we queued
+            cached = self._cached_disk_usage(website.id, mtime_ns)
+            if cached is not None:
+                return cached
+            total = await asyncio.to_thread(_tree_size, website.document_root)
+        _DU_CACHE[website.id] = (mtime_ns, time.monotonic(), total)
+        return total
+    
+    @staticmethod
+    def _cached_disk_usage(website_id: int, mtime_ns: int) -> Optional[int]:
+        """Cached disk usage if the root is unchanged and the figure is fresh"""
+        cached = _DU_CACHE.get(website_id)
+        if cached is not None and cached[0] == mtime_ns and time.monotonic() - cached[1] < DISK_USAGE_MAX_AGE:
+            return cached[2]
+        return None
+    
     async def create_backup(self, website_id: int) -> Backup:
         """Create a backup of the website"""
-        website = self.db.query(Website).filter(Website.id == website_id).first()
+        website = await self.db.get(Website, website_id)
         if not website:
             raise ValueError("Website not found")
         
         # Create backup filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
         backup_filename = f"{website.domain}_{timestamp}.tar.gz"
         backup_path = os.path.join(settings.BACKUP_PATH, backup_filename)
         
-        # Create backup
-        subprocess.run([
-            "tar", "-czf", backup_path, "-C", settings.BASE_DIR, 
-            os.path.basename(website.document_root)
-        ])
-        
-        # Get backup size
-        backup_size = os.path.getsize(backup_path)
+        # Create backup in a worker thread; no tar or gzip process needed.
+        # wait_for can't stop the thread, so on timeout it's told to give up
+        cancel = threading.Event()
+        try:
+            backup_size = await asyncio.wait_for(
+                asyncio.to_thread(_write_archive, backup_path, website.document_root, cancel),
+                settings.BACKUP_TIMEOUT
+            )
+        except BaseException:
+            cancel.set()
+            # The thread may have just finished; don't keep an unrecorded archive
+            try:
+                os.remove(backup_path)
+            except FileNotFoundError:
+                pass
+            raise
         
         # Create backup record
         backup = Backup(
@@ -175,18 +539,19 @@ class WebsiteService:
             type="website",
             path=backup_path,
             size=backup_size,
-            status="completed"
+            status="completed",
+            website_id=website.id
         )
         
+        # The flush assigns the id; callers don't need the reloaded row
         self.db.add(backup)
-        self.db.commit()
-        self.db.refresh(backup)
+        await self.db.commit()
         
         return backup
     
     async def restart_website(self, website_id: int):
         """Restart a website"""
-        website = self.db.query(Website).filter(Website.id == website_id).first()
+        website = await self.db.get(Website, website_id)
         if not website:
             raise ValueError("Website not found")
         
@@ -208,145 +573,43 @@ class WebsiteService:
     
     async def _setup_wordpress(self, website: Website):
         """Setup WordPress website"""
-        # Download WordPress
-        subprocess.run([
-            "wget", "https://wordpress.org/latest.tar.gz", 
-            "-O", f"{website.document_root}/wordpress.tar.gz"
-        ], cwd=website.document_root)
-        
-        # Extract WordPress
-        subprocess.run([
-            "tar", "-xzf", "wordpress.tar.gz", "--strip-components=1"
-        ], cwd=website.document_root)
-        
-        # Clean up
-        os.remove(f"{website.document_root}/wordpress.tar.gz")
-        
-        # Set permissions
-        subprocess.run(["chown", "-R", "www-data:www-data", website.document_root])
-        subprocess.run(["chmod", "-R", "755", website.document_root])
+        # Download and extract WordPress in one pass, without a temporary tarball
+        await asyncio.to_thread(_download_and_extract, WORDPRESS_URL, website.document_root)
     
     async def _setup_php(self, website: Website):
         """Setup PHP website"""
         # Create index.php file
-        index_content = """<!DOCTYPE html>
-<html>
-<head>
-    <title><?php echo htmlspecialchars($_SERVER['HTTP_HOST']); ?></title>
-</head>
-<body>
-    <h1>Welcome to <?php echo htmlspecialchars($_SERVER['HTTP_HOST']); ?></h1>
-    <p>PHP version: <?php echo phpversion(); ?></p>
-    <p>Server time: <?php echo date('Y-m-d H:i:s'); ?></p>
-</body>
-</html>"""
-        
-        with open(f"{website.document_root}/index.php", "w") as f:
-            f.write(index_content)
+        await _write_file(f"{website.document_root}/index.php", _PHP_INDEX)
     
     async def _setup_static(self, website: Website):
         """Setup static website"""
         # Create index.html file
-        index_content = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Welcome to {domain}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 40px; }}
-        .container {{ max-width: 800px; margin: 0 auto; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Welcome to {domain}</h1>
-        <p>Your static website is ready!</p>
-        <p>Upload your files to this directory to get started.</p>
-    </div>
-</body>
-</html>""".format(domain=website.domain)
-        
-        with open(f"{website.document_root}/index.html", "w") as f:
-            f.write(index_content)
+        await _write_file(
+            f"{website.document_root}/index.html",
+            _STATIC_INDEX.substitute(domain=website.domain).encode()
+        )
     
     async def _setup_python(self, website: Website):
         """Setup Python website"""
-        # Create requirements.txt
-        requirements_content = """Flask==2.3.3
-gunicorn==21.2.0"""
-        
-        with open(f"{website.document_root}/requirements.txt", "w") as f:
-            f.write(requirements_content)
-        
-        # Create app.py
-        app_content = """from flask import Flask, render_template_string
-
-app = Flask(__name__)
-
-@app.route('/')
-def index():
-    return render_template_string('''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Welcome to {{ domain }}</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                .container { max-width: 800px; margin: 0 auto; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>Welcome to {{ domain }}</h1>
-                <p>Your Python Flask application is ready!</p>
-                <p>Edit app.py to customize your application.</p>
-            </div>
-        </body>
-        </html>
-    ''', domain='{domain}')
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)""".format(domain=website.domain)
-        
-        with open(f"{website.document_root}/app.py", "w") as f:
-            f.write(app_content)
+        # Create requirements.txt and app.py
+        await asyncio.gather(
+            _write_file(f"{website.document_root}/requirements.txt", _PYTHON_REQUIREMENTS),
+            _write_file(
+                f"{website.document_root}/app.py",
+                _PYTHON_APP.substitute(domain=website.domain).encode()
+            )
+        )
     
     async def _setup_docker(self, website: Website):
         """Setup Docker website"""
-        # Create docker-compose.yml
-        docker_compose_content = """version: '3.8'
-
-services:
-  web:
-    image: nginx:alpine
-    ports:
-      - "8080:80"
-    volumes:
-      - ./html:/usr/share/nginx/html
-    restart: unless-stopped"""
-        
-        with open(f"{website.document_root}/docker-compose.yml", "w") as f:
-            f.write(docker_compose_content)
-        
-        # Create html directory and index.html
-        os.makedirs(f"{website.document_root}/html", exist_ok=True)
-        
-        index_content = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Welcome to {domain}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 40px; }}
-        .container {{ max-width: 800px; margin: 0 auto; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Welcome to {domain}</h1>
-        <p>Your Docker container is ready!</p>
-        <p>Edit the docker-compose.yml file to customize your setup.</p>
-    </div>
-</body>
-</html>""".format(domain=website.domain)
-        
-        with open(f"{website.document_root}/html/index.html", "w") as f:
-            f.write(index_content) 
\ No newline at end of file
+        # Create html directory
+        await asyncio.to_thread(os.makedirs, f"{website.document_root}/html", exist_ok=True)
+        
+        # Create docker-compose.yml and index.html
+        await asyncio.gather(
+            _write_file(f"{website.document_root}/docker-compose.yml", _DOCKER_COMPOSE),
+            _write_file(
+                f"{website.document_root}/html/index.html",
+                _DOCKER_INDEX.substitute(domain=website.domain).encode()
+            )
+        )
@@ -61,7 +61,8 @@ sudo apt-get install -y \
     wget \
     unzip \
     tar \
-    gzip
+    gzip \
+    pigz
 
 # Start and enable services
 print_status "Starting and enabling services..."
@@ -17,9 +17,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.mysql import close_pool as close_mysql_pool
+from app.core.systemd import close_bus as close_systemd_bus
 from app.api.v1.api import api_router
 from app.core.security import create_admin_user
 from app.services.system_monitor import SystemMonitor
+from app.services.ssl_service import SSLService
 
 
 @asynccontextmanager
@@ -37,6 +40,9 @@ async def lifespan(app: FastAPI):
     # Start system monitoring
     SystemMonitor.start()
     
+    # Renew certificates issued by the in-process ACME client
+    SSLService.start_auto_renewal()
+    
     print("✅ Modern Hosting Panel is ready!")
     
     yield
@@ -44,6 +50,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("🛑 Shutting down Modern Hosting Panel...")
     SystemMonitor.stop()
+    SSLService.stop_auto_renewal()
+    await close_mysql_pool()
+    close_systemd_bus()
 
 
 # Create FastAPI application